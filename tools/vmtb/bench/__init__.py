@@ -3,12 +3,16 @@
 
 import logging
 import logging.config
+import logging.handlers
+import typing
+
+LOG_FORMAT_DETAILED = '%(asctime)s [%(levelname)s]: %(name)s (%(funcName)s:%(lineno)d) - %(message)s'
 
 LOG_CONFIG = {
     "version": 1,
     "formatters": {
         "detailed": {
-            "format": "%(asctime)s [%(levelname)s]: %(name)s (%(funcName)s:%(lineno)d) - %(message)s"
+            "format": LOG_FORMAT_DETAILED
         },
         "simple": {"format": "%(levelname)s - %(message)s"},
     },
@@ -19,25 +23,41 @@ LOG_CONFIG = {
             "level": "WARNING",
             "stream": "ext://sys.stdout",
         },
-        "file": {
-            "backupCount": 5,
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "logfile.log",
-            "formatter": "detailed",
-            "maxBytes": 5242880,
-        },
     },
     "root": {
-        "handlers": ["console", "file"],
+        "handlers": ["console"],
         "level": "DEBUG"
     }
 }
 
+# Rotating log file is not opened on import, but installed by the test runner
+# via configure_file_logging()
+LOG_FILE_NAME = 'logfile.log'
+LOG_FILE_MAX_BYTES = 5242880
+LOG_FILE_BACKUP_COUNT = 5
+
 logging.config.dictConfig(LOG_CONFIG)
 
 logger = logging.getLogger('VmtbInit')
 
-logger.info('###########################################')
-logger.info('#              VM Test Bench              #')
-logger.info('#    SR-IOV VM-level validation suite     #')
-logger.info('###########################################')
+_file_handler: typing.Optional[logging.Handler] = None
+
+
+def configure_file_logging(filename: str = LOG_FILE_NAME) -> None:
+    """Attach rotating log file handler to the root logger (once)."""
+    global _file_handler # pylint: disable=W0603
+    if _file_handler is not None:
+        return
+
+    _file_handler = logging.handlers.RotatingFileHandler(filename,
+                                                         maxBytes=LOG_FILE_MAX_BYTES,
+                                                         backupCount=LOG_FILE_BACKUP_COUNT)
+    _file_handler.setFormatter(logging.Formatter(LOG_FORMAT_DETAILED))
+    logging.getLogger().addHandler(_file_handler)
+
+
+def print_banner() -> None:
+    logger.info('###########################################')
+    logger.info('#              VM Test Bench              #')
+    logger.info('#    SR-IOV VM-level validation suite     #')
+    logger.info('###########################################')
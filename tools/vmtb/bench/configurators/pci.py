@@ -2,6 +2,7 @@
 # Copyright © 2024 Intel Corporation
 
 import enum
+import types
 import typing
 
 
@@ -16,19 +17,16 @@ class GpuModel(str, enum.Enum):
 
 def get_gpu_model(pci_id: str) -> GpuModel:
     """Return GPU model associated with a given PCI Device ID."""
-    return pci_ids.get(pci_id.upper(), GpuModel.Unknown)
+    # PCI IDs are usually already upper-case, so try a direct lookup first
+    gpu_model = pci_ids.get(pci_id)
+    if gpu_model is None:
+        gpu_model = pci_ids.get(pci_id.upper(), GpuModel.Unknown)
+    return gpu_model
 
 
 def get_vgpu_profiles_file(gpu_model: GpuModel) -> str:
     """Return vGPU profile definition JSON file for a given GPU model."""
-    if gpu_model == GpuModel.ATSM150:
-        vgpu_device_file = 'Flex170.json'
-    elif gpu_model == GpuModel.ATSM75:
-        vgpu_device_file = 'Flex140.json'
-    else: # GpuModel.Unknown
-        vgpu_device_file = 'N/A'
-
-    return vgpu_device_file
+    return _vgpu_profiles_files.get(gpu_model, 'N/A')
 
 
 # PCI Device IDs: ATS-M150 (M1)
@@ -45,4 +43,11 @@ _atsm75_pci_ids = {
 
 
 # All PCI Device IDs to GPU Device Names mapping
-pci_ids: typing.Dict[str, GpuModel] = {**_atsm150_pci_ids, **_atsm75_pci_ids}
+pci_ids: typing.Mapping[str, GpuModel] = types.MappingProxyType({**_atsm150_pci_ids, **_atsm75_pci_ids})
+
+
+# GPU models to vGPU profile definition JSON files mapping
+_vgpu_profiles_files: typing.Mapping[GpuModel, str] = types.MappingProxyType({
+    GpuModel.ATSM150: 'Flex170.json',
+    GpuModel.ATSM75: 'Flex140.json'
+})
@@ -1,18 +1,25 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import ast
 import json
 import logging
+import mmap
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 from bench import exceptions
 
+try:
+    import orjson as json_parser
+except ImportError: # orjson is optional - fall back to the stdlib parser
+    json_parser = json  # type: ignore[no-redef]
+
 logger = logging.getLogger('VgpuProfile')
 
 
-@dataclass
+@dataclass(slots=True)
 class VgpuResourcesConfig:
     pfLmem: int = 0
     pfContexts: int = 0
@@ -24,7 +31,7 @@ class VgpuResourcesConfig:
     vfGgtt: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class VgpuSchedulerConfig:
     scheduleIfIdle: bool = False
     pfExecutionQuanta: int = 0
@@ -33,7 +40,7 @@ class VgpuSchedulerConfig:
     vfPreemptionTimeout: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class VgpuSecurityConfig:
     reset_after_vf_switch: bool = False
     guc_sampling_period: int = 0
@@ -45,7 +52,7 @@ class VgpuSecurityConfig:
     guc_threshold_engine_reset: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class VgpuProfile:
     num_vfs: int = 0
     scheduler: VgpuSchedulerConfig = field(default_factory=VgpuSchedulerConfig)
@@ -53,6 +60,9 @@ class VgpuProfile:
     security: VgpuSecurityConfig = field(default_factory=VgpuSecurityConfig)
 
     def print_parameters(self) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
         logger.info(
             "\nvGPU Profile:\n"
             "   Num VFs = %s\n"
@@ -88,7 +98,7 @@ class VgpuProfile:
 
 
 # Structures for mapping vGPU profiles definition from JSON files
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VgpuProfilePfResourcesDefinition:
     profile_name: str
     local_memory_ecc_off: int
@@ -98,7 +108,7 @@ class VgpuProfilePfResourcesDefinition:
     ggtt_size: int
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VgpuProfileVfResourcesDefinition:
     profile_name: str
     vf_count: int
@@ -109,7 +119,7 @@ class VgpuProfileVfResourcesDefinition:
     ggtt_size: int
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VgpuProfileSchedulerDefinition:
     profile_name: str = 'N/A'
     schedule_if_idle: bool = False
@@ -117,14 +127,17 @@ class VgpuProfileSchedulerDefinition:
     pf_preemption_timeout: int = 0
     vf_execution_quanta: str = ''   # To calculate based on number of VFs
     vf_preemption_timeout: str = '' # To calculate based on number of VFs
+    # VF EQ/PT lambdas compiled from the above definitions
+    vf_execution_quanta_fn: Optional[Callable[[int], Any]] = None
+    vf_preemption_timeout_fn: Optional[Callable[[int], Any]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class VgpuProfileSecurityDefinition(VgpuSecurityConfig):
     profile_name: str = 'N/A'
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VgpuProfilesDefinitions:
     pf_resource_default: str
     pf_resources: List[VgpuProfilePfResourcesDefinition]
@@ -134,6 +147,39 @@ class VgpuProfilesDefinitions:
     scheduler_configs: List[VgpuProfileSchedulerDefinition]
     security_config_default: str
     security_configs: List[VgpuProfileSecurityDefinition]
+    # Lookup tables built at parse time:
+    # profiles indexed by name and VF resources sorted by an ascending VF count
+    pf_resources_by_name: Dict[str, VgpuProfilePfResourcesDefinition] = field(default_factory=dict)
+    vf_resources_by_count: List[VgpuProfileVfResourcesDefinition] = field(default_factory=list)
+    scheduler_configs_by_name: Dict[str, VgpuProfileSchedulerDefinition] = field(default_factory=dict)
+    security_configs_by_name: Dict[str, VgpuProfileSecurityDefinition] = field(default_factory=dict)
+    # Default profiles resolved at parse time (None if not defined)
+    pf_resource_default_obj: Optional[VgpuProfilePfResourcesDefinition] = None
+    security_config_default_obj: Optional[VgpuProfileSecurityDefinition] = None
+
+
+# Builtins available for VF EQ/PT lambdas defined in vGPU profiles
+_VF_LAMBDA_BUILTINS = {'max': max, 'min': min, 'abs': abs, 'int': int, 'round': round}
+
+
+def compile_vf_lambda(lambda_str: str) -> Callable[[int], Any]:
+    """Compile a lambda expression (calculating value for a given number of VFs) from vGPU profile definition."""
+    # Function eval is needed to create lambda defined in the JSON file
+    # Disable eval warning
+    # pylint: disable=W0123
+    try:
+        expr = ast.parse(lambda_str.strip(), mode='eval')
+    except SyntaxError as exc:
+        logger.error("Invalid vGPU profile lambda: %s (%s)", lambda_str, exc)
+        raise exceptions.VgpuProfileError(f'Invalid vGPU profile lambda: {lambda_str}') from exc
+
+    if not isinstance(expr.body, ast.Lambda):
+        logger.error("vGPU profile definition is not a lambda: %s", lambda_str)
+        raise exceptions.VgpuProfileError(f'vGPU profile definition is not a lambda: {lambda_str}')
+
+    lambda_fn: Callable[[int], Any] = eval(compile(expr, '<vgpu_profile>', 'eval'),
+                                           {'__builtins__': _VF_LAMBDA_BUILTINS})
+    return lambda_fn
 
 
 class VgpuProfilesJsonReader:
@@ -142,28 +188,40 @@ class VgpuProfilesJsonReader:
         self.vgpu_profiles: VgpuProfilesDefinitions = self.parse_json_file(vgpu_profile_data)
 
     def read_json_file(self, vgpu_json_file: Path) -> Any:
-        if not Path(vgpu_json_file).exists():
+        try:
+            json_file = open(vgpu_json_file, mode='rb') # pylint: disable=R1732
+        except FileNotFoundError as exc:
             logger.error("vGPU profile JSON file not found: %s", vgpu_json_file)
-            raise exceptions.VgpuProfileError(f'vGPU profile JSON file not found: {vgpu_json_file}')
+            raise exceptions.VgpuProfileError(f'vGPU profile JSON file not found: {vgpu_json_file}') from exc
 
-        with open(vgpu_json_file, mode='r', encoding='utf-8') as json_file:
+        with json_file:
             try:
-                vgpu_json = json.load(json_file)
-            except json.JSONDecodeError as exc:
+                # Map the file instead of copying its content to an intermediate buffer
+                with mmap.mmap(json_file.fileno(), 0, access=mmap.ACCESS_READ) as json_buf:
+                    vgpu_json = self.__parse_json_buffer(json_buf)
+            except ValueError as exc: # json.JSONDecodeError or an empty file (cannot be mapped)
                 logger.error("Invalid vGPU profile JSON format: %s", exc)
                 raise exceptions.VgpuProfileError('Invalid vGPU profile definition JSON format')
 
         return vgpu_json
 
+    def __parse_json_buffer(self, json_buf: mmap.mmap) -> Any:
+        if json_parser is json:
+            # Stdlib parser does not accept buffer objects - bytes copy is needed
+            return json.loads(json_buf[:])
+
+        with memoryview(json_buf) as json_view:
+            return json_parser.loads(json_view)
+
     def __parse_pf_resource_profiles(self, pf_profiles: Dict) -> List[VgpuProfilePfResourcesDefinition]:
         pf_resources: List[VgpuProfilePfResourcesDefinition] = []
 
-        for pf_profile_name in pf_profiles.keys():
-            lmem_ecc_off = pf_profiles[pf_profile_name]['LocalMemoryEccOff']
-            lmem_ecc_on = pf_profiles[pf_profile_name]['LocalMemoryEccOn']
-            contexts = pf_profiles[pf_profile_name]['Contexts']
-            doorbells = pf_profiles[pf_profile_name]['Doorbells']
-            ggtt_size = pf_profiles[pf_profile_name]['GGTTSize']
+        for pf_profile_name, pf_profile in pf_profiles.items():
+            lmem_ecc_off = pf_profile['LocalMemoryEccOff']
+            lmem_ecc_on = pf_profile['LocalMemoryEccOn']
+            contexts = pf_profile['Contexts']
+            doorbells = pf_profile['Doorbells']
+            ggtt_size = pf_profile['GGTTSize']
 
             current_pf_resource = VgpuProfilePfResourcesDefinition(pf_profile_name,
                                                                    lmem_ecc_off,
@@ -179,13 +237,13 @@ class VgpuProfilesJsonReader:
     def __parse_vf_resource_profiles(self, vf_profiles: Dict) -> List[VgpuProfileVfResourcesDefinition]:
         vf_resources: List[VgpuProfileVfResourcesDefinition] = []
 
-        for vf_profile_name in vf_profiles.keys():
-            vf_count = vf_profiles[vf_profile_name]['VFCount']
-            lmem_ecc_off = vf_profiles[vf_profile_name]['LocalMemoryEccOff']
-            lmem_ecc_on = vf_profiles[vf_profile_name]['LocalMemoryEccOn']
-            contexts = vf_profiles[vf_profile_name]['Contexts']
-            doorbells = vf_profiles[vf_profile_name]['Doorbells']
-            ggtt_size = vf_profiles[vf_profile_name]['GGTTSize']
+        for vf_profile_name, vf_profile in vf_profiles.items():
+            vf_count = vf_profile['VFCount']
+            lmem_ecc_off = vf_profile['LocalMemoryEccOff']
+            lmem_ecc_on = vf_profile['LocalMemoryEccOn']
+            contexts = vf_profile['Contexts']
+            doorbells = vf_profile['Doorbells']
+            ggtt_size = vf_profile['GGTTSize']
 
             current_vf_resource = VgpuProfileVfResourcesDefinition(vf_profile_name,
                                                                    vf_count,
@@ -202,17 +260,21 @@ class VgpuProfilesJsonReader:
     def __parse_scheduler_profiles(self, scheduler_profiles: Dict) -> List[VgpuProfileSchedulerDefinition]:
         scheduler_configs: List[VgpuProfileSchedulerDefinition] = []
 
-        for scheduler_profile_name in scheduler_profiles.keys():
-            schedule_if_idle = scheduler_profiles[scheduler_profile_name]['GPUTimeSlicing']['ScheduleIfIdle']
-            pf_eq = scheduler_profiles[scheduler_profile_name]['GPUTimeSlicing']['PFExecutionQuantum']
-            pf_pt = scheduler_profiles[scheduler_profile_name]['GPUTimeSlicing']['PFPreemptionTimeout']
-            vf_eq = scheduler_profiles[scheduler_profile_name]['GPUTimeSlicing']['VFAttributes']['VFExecutionQuantum']
-            vf_pt = scheduler_profiles[scheduler_profile_name]['GPUTimeSlicing']['VFAttributes']['VFPreemptionTimeout']
+        for scheduler_profile_name, scheduler_profile in scheduler_profiles.items():
+            time_slicing = scheduler_profile['GPUTimeSlicing']
+            vf_attributes = time_slicing['VFAttributes']
+            schedule_if_idle = time_slicing['ScheduleIfIdle']
+            pf_eq = time_slicing['PFExecutionQuantum']
+            pf_pt = time_slicing['PFPreemptionTimeout']
+            vf_eq = vf_attributes['VFExecutionQuantum']
+            vf_pt = vf_attributes['VFPreemptionTimeout']
 
             current_scheduler = VgpuProfileSchedulerDefinition(scheduler_profile_name,
                                                                schedule_if_idle,
                                                                pf_eq, pf_pt,
-                                                               vf_eq, vf_pt)
+                                                               vf_eq, vf_pt,
+                                                               compile_vf_lambda(vf_eq),
+                                                               compile_vf_lambda(vf_pt))
 
             scheduler_configs.append(current_scheduler)
 
@@ -221,15 +283,15 @@ class VgpuProfilesJsonReader:
     def __parse_security_profiles(self, security_profiles: Dict) -> List[VgpuProfileSecurityDefinition]:
         security_configs: List[VgpuProfileSecurityDefinition] = []
 
-        for security_profile_name in security_profiles.keys():
-            reset_after_vf_switch = security_profiles[security_profile_name]['ResetAfterVfSwitch']
-            guc_sampling_period = security_profiles[security_profile_name]['GuCSamplingPeriod']
-            guc_threshold_cat_error = security_profiles[security_profile_name]['GuCThresholdCATError']
-            guc_threshold_page_fault = security_profiles[security_profile_name]['GuCThresholdPageFault']
-            guc_threshold_h2g_storm = security_profiles[security_profile_name]['GuCThresholdH2GStorm']
-            guc_threshold_db_storm = security_profiles[security_profile_name]['GuCThresholdDbStorm']
-            guc_treshold_gt_irq_storm = security_profiles[security_profile_name]['GuCThresholdGTIrqStorm']
-            guc_threshold_engine_reset = security_profiles[security_profile_name]['GuCThresholdEngineReset']
+        for security_profile_name, security_profile in security_profiles.items():
+            reset_after_vf_switch = security_profile['ResetAfterVfSwitch']
+            guc_sampling_period = security_profile['GuCSamplingPeriod']
+            guc_threshold_cat_error = security_profile['GuCThresholdCATError']
+            guc_threshold_page_fault = security_profile['GuCThresholdPageFault']
+            guc_threshold_h2g_storm = security_profile['GuCThresholdH2GStorm']
+            guc_threshold_db_storm = security_profile['GuCThresholdDbStorm']
+            guc_treshold_gt_irq_storm = security_profile['GuCThresholdGTIrqStorm']
+            guc_threshold_engine_reset = security_profile['GuCThresholdEngineReset']
 
             # VgpuSecurityConfig (base class) params go first, therefore profile name
             # is the last param on the VgpuProfileSecurityDefinition initialization list in this case
@@ -260,5 +322,14 @@ class VgpuProfilesJsonReader:
         security_default =  vgpu_json['vGPUSecurity']['Default']
         security_configs = self.__parse_security_profiles(vgpu_json['vGPUSecurity']['Profile'])
 
+        pf_resources_by_name = {pf.profile_name: pf for pf in pf_resources}
+        security_configs_by_name = {sc.profile_name: sc for sc in security_configs}
+
         return VgpuProfilesDefinitions(pf_resource_default, pf_resources, vf_resource_default, vf_resources,
-                                       scheduler_default, scheduler_configs, security_default, security_configs)
+                                       scheduler_default, scheduler_configs, security_default, security_configs,
+                                       pf_resources_by_name=pf_resources_by_name,
+                                       vf_resources_by_count=sorted(vf_resources, key=lambda vf: vf.vf_count),
+                                       scheduler_configs_by_name={sc.profile_name: sc for sc in scheduler_configs},
+                                       security_configs_by_name=security_configs_by_name,
+                                       pf_resource_default_obj=pf_resources_by_name.get(pf_resource_default),
+                                       security_config_default_obj=security_configs_by_name.get(security_default))
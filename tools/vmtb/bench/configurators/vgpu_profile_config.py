@@ -1,6 +1,8 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import bisect
+import functools
 import logging
 from enum import Enum
 from pathlib import Path
@@ -28,6 +30,13 @@ class VfSchedulingMode(str, Enum):
         return str.__str__(self)
 
 
+@functools.lru_cache(maxsize=8)
+def _load_profiles(vgpu_json_path: str) -> VgpuProfilesDefinitions:
+    # Profile definitions are read-only after parsing, so a single instance
+    # can be safely shared by all configurators using the same JSON file
+    return VgpuProfilesJsonReader(Path(vgpu_json_path)).vgpu_profiles
+
+
 class VgpuProfileConfigurator:
     def __init__(self, vgpu_profiles_dir: Path, gpu_model: GpuModel = GpuModel.Unknown) -> None:
         self.gpu_model: GpuModel = gpu_model
@@ -46,8 +55,7 @@ class VgpuProfileConfigurator:
 
     def query_vgpu_profiles(self) -> VgpuProfilesDefinitions:
         """Get all vGPU profiles supported for a given GPU device."""
-        json_reader = VgpuProfilesJsonReader(self.__helper_create_vgpu_json_path(self.vgpu_profiles_dir))
-        return json_reader.vgpu_profiles
+        return _load_profiles(str(self.__helper_create_vgpu_json_path(self.vgpu_profiles_dir)))
 
     def select_vgpu_resources_profile(self, requested_num_vfs: int) -> VgpuResourcesConfig:
         """Find vGPU profile matching requested number of VFs.
@@ -55,94 +63,73 @@ class VgpuProfileConfigurator:
         - if requested profile with 3 VFs is not available, return close config with 4 VFs.
         - if requested profile with neither 9 VFs, nor with 10 or 11 VFs is available - throw 'not found' exeception.
         """
-        vgpu_resources_config = VgpuResourcesConfig()
-
-        for pf_resource in self.supported_vgpu_profiles.pf_resources:
-            if pf_resource.profile_name == self.supported_vgpu_profiles.pf_resource_default:
-                vgpu_resources_config.pfLmem = pf_resource.local_memory_ecc_on
-                vgpu_resources_config.pfContexts = pf_resource.contexts
-                vgpu_resources_config.pfDoorbells = pf_resource.doorbells
-                vgpu_resources_config.pfGgtt = pf_resource.ggtt_size
-
-        is_vf_resource_found = False
-        for vf_resource in self.supported_vgpu_profiles.vf_resources:
-            current_num_vfs = vf_resource.vf_count
-
-            if current_num_vfs == requested_num_vfs:
-                is_vf_resource_found = True # Exact match
-            elif requested_num_vfs < current_num_vfs <= requested_num_vfs + 2:
-                logger.debug("Unable to find accurate vGPU profile but have similar: %s", vf_resource.profile_name)
-                is_vf_resource_found = True # Approximate match
-
-            if is_vf_resource_found:
-                vgpu_resources_config.vfLmem = vf_resource.local_memory_ecc_on
-                vgpu_resources_config.vfContexts = vf_resource.contexts
-                vgpu_resources_config.vfDoorbells = vf_resource.doorbells
-                vgpu_resources_config.vfGgtt = vf_resource.ggtt_size
-                break
-
-        if not is_vf_resource_found:
+        pf_resource = self.supported_vgpu_profiles.pf_resource_default_obj
+
+        # Find the first VF resources profile with VF count not lower than requested
+        vf_resources = self.supported_vgpu_profiles.vf_resources_by_count
+        vf_idx = bisect.bisect_left(vf_resources, requested_num_vfs, key=lambda vf: vf.vf_count)
+
+        if vf_idx == len(vf_resources) or vf_resources[vf_idx].vf_count > requested_num_vfs + 2:
             logger.error("vGPU VF resources profile %sxVF not found!", requested_num_vfs)
             raise exceptions.VgpuProfileError(f'vGPU VF resources profile {requested_num_vfs}xVF not found!')
 
-        return vgpu_resources_config
+        vf_resource = vf_resources[vf_idx]
+        if vf_resource.vf_count != requested_num_vfs:
+            logger.debug("Unable to find accurate vGPU profile but have similar: %s", vf_resource.profile_name)
+
+        return VgpuResourcesConfig(pfLmem=pf_resource.local_memory_ecc_on if pf_resource else 0,
+                                   pfContexts=pf_resource.contexts if pf_resource else 0,
+                                   pfDoorbells=pf_resource.doorbells if pf_resource else 0,
+                                   pfGgtt=pf_resource.ggtt_size if pf_resource else 0,
+                                   vfLmem=vf_resource.local_memory_ecc_on,
+                                   vfContexts=vf_resource.contexts,
+                                   vfDoorbells=vf_resource.doorbells,
+                                   vfGgtt=vf_resource.ggtt_size)
 
     def select_vgpu_scheduler_profile(self, requested_num_vfs: int,
                                       requested_scheduler: VfSchedulingMode) -> VgpuSchedulerConfig:
-        # Function eval is needed to calculate VF EQ/PT for num_vfs
-        # Disable eval warning
-        # pylint: disable=W0123
-        vgpu_scheduler_config = VgpuSchedulerConfig()
-
         if requested_scheduler is VfSchedulingMode.INFINITE:
-            return vgpu_scheduler_config
+            return VgpuSchedulerConfig()
 
-        for scheduler in self.supported_vgpu_profiles.scheduler_configs:
-            if scheduler.profile_name == requested_scheduler:
-                vgpu_scheduler_config.scheduleIfIdle = scheduler.schedule_if_idle
-                vgpu_scheduler_config.pfExecutionQuanta = scheduler.pf_execution_quanta
-                vgpu_scheduler_config.pfPreemptionTimeout = scheduler.pf_preemption_timeout
+        scheduler = self.supported_vgpu_profiles.scheduler_configs_by_name.get(requested_scheduler)
+        if not scheduler:
+            return VgpuSchedulerConfig()
 
-                lambda_vf_eq = eval(scheduler.vf_execution_quanta)
-                lambda_vf_eq_result = lambda_vf_eq(requested_num_vfs)
+        # VF EQ/PT lambdas are compiled once, when the profile definition is parsed
+        vf_eq_fn = scheduler.vf_execution_quanta_fn
+        vf_pt_fn = scheduler.vf_preemption_timeout_fn
 
-                lambda_vf_pt = eval(scheduler.vf_preemption_timeout)
-                lambda_vf_pt_result = lambda_vf_pt(requested_num_vfs)
-
-                vgpu_scheduler_config.vfExecutionQuanta = lambda_vf_eq_result
-                vgpu_scheduler_config.vfPreemptionTimeout = lambda_vf_pt_result
-
-        return vgpu_scheduler_config
+        return VgpuSchedulerConfig(scheduleIfIdle=scheduler.schedule_if_idle,
+                                   pfExecutionQuanta=scheduler.pf_execution_quanta,
+                                   pfPreemptionTimeout=scheduler.pf_preemption_timeout,
+                                   vfExecutionQuanta=vf_eq_fn(requested_num_vfs) if vf_eq_fn else 0,
+                                   vfPreemptionTimeout=vf_pt_fn(requested_num_vfs) if vf_pt_fn else 0)
 
     def select_vgpu_security_profile(self) -> VgpuSecurityConfig:
         # Currently supports only default security profile
-        vgpu_security_config = VgpuSecurityConfig()
-
-        for security_profile in self.supported_vgpu_profiles.security_configs:
-            if security_profile.profile_name == self.supported_vgpu_profiles.security_config_default:
-                vgpu_security_config.reset_after_vf_switch = security_profile.reset_after_vf_switch
-                vgpu_security_config.guc_sampling_period = security_profile.guc_sampling_period
-                vgpu_security_config.guc_threshold_cat_error = security_profile.guc_threshold_cat_error
-                vgpu_security_config.guc_threshold_page_fault = security_profile.guc_threshold_page_fault
-                vgpu_security_config.guc_threshold_h2g_storm = security_profile.guc_threshold_h2g_storm
-                vgpu_security_config.guc_threshold_db_storm = security_profile.guc_threshold_db_storm
-                vgpu_security_config.guc_treshold_gt_irq_storm = security_profile.guc_treshold_gt_irq_storm
-                vgpu_security_config.guc_threshold_engine_reset = security_profile.guc_threshold_engine_reset
-
-        return vgpu_security_config
+        security_profile = self.supported_vgpu_profiles.security_config_default_obj
+        if not security_profile:
+            return VgpuSecurityConfig()
+
+        return VgpuSecurityConfig(reset_after_vf_switch=security_profile.reset_after_vf_switch,
+                                  guc_sampling_period=security_profile.guc_sampling_period,
+                                  guc_threshold_cat_error=security_profile.guc_threshold_cat_error,
+                                  guc_threshold_page_fault=security_profile.guc_threshold_page_fault,
+                                  guc_threshold_h2g_storm=security_profile.guc_threshold_h2g_storm,
+                                  guc_threshold_db_storm=security_profile.guc_threshold_db_storm,
+                                  guc_treshold_gt_irq_storm=security_profile.guc_treshold_gt_irq_storm,
+                                  guc_threshold_engine_reset=security_profile.guc_threshold_engine_reset)
 
     def get_vgpu_profile(self, requested_num_vfs: int, requested_scheduler: VfSchedulingMode) -> VgpuProfile:
         """Get vGPU profile for requested number of VFs, scheduler and security modes."""
         logger.info("Requested vGPU profile: %s VFs / scheduling: %s", requested_num_vfs, requested_scheduler)
 
-        vgpu_profile: VgpuProfile = VgpuProfile()
-        vgpu_profile.num_vfs = requested_num_vfs
-        vgpu_profile.resources = self.select_vgpu_resources_profile(requested_num_vfs)
+        resources = self.select_vgpu_resources_profile(requested_num_vfs)
 
         if requested_scheduler is VfSchedulingMode.DEFAULT_PROFILE:
             requested_scheduler = VfSchedulingMode(self.supported_vgpu_profiles.scheduler_config_default)
 
-        vgpu_profile.scheduler = self.select_vgpu_scheduler_profile(requested_num_vfs, requested_scheduler)
-        vgpu_profile.security = self.select_vgpu_security_profile()
-
-        return vgpu_profile
+        return VgpuProfile(num_vfs=requested_num_vfs,
+                           scheduler=self.select_vgpu_scheduler_profile(requested_num_vfs, requested_scheduler),
+                           resources=resources,
+                           security=self.select_vgpu_security_profile())
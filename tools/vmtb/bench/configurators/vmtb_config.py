@@ -9,10 +9,15 @@ from typing import Any, Dict
 
 from bench import exceptions
 
+try:
+    import orjson as json_parser
+except ImportError: # orjson is optional - fall back to the stdlib parser
+    json_parser = json  # type: ignore[no-redef]
+
 logger = logging.getLogger('VmtbConfigurator')
 
 
-@dataclass
+@dataclass(slots=True)
 class VmtbIgtConfig:
     test_dir: str
     tool_dir: str
@@ -21,21 +26,21 @@ class VmtbIgtConfig:
     options: str
 
 
-@dataclass
+@dataclass(slots=True)
 class VmtbHostConfig:
     card_index: int
     driver: str
     igt_config: VmtbIgtConfig
 
 
-@dataclass
+@dataclass(slots=True)
 class VmtbGuestConfig:
     os_image_path: str
     driver: str
     igt_config: VmtbIgtConfig
 
 
-@dataclass
+@dataclass(slots=True)
 class VmtbConfig:
     host_config: VmtbHostConfig
     guest_config: VmtbGuestConfig
@@ -66,13 +71,15 @@ class VmtbConfigJsonReader:
         self.vmtb_config: VmtbConfig = self.parse_json_file(vgpu_profile_data)
 
     def read_json_file(self, config_json_file: Path) -> Any:
-        if not config_json_file.exists():
+        try:
+            json_file = open(config_json_file, mode='rb') # pylint: disable=R1732
+        except FileNotFoundError as exc:
             logger.error("VMTB config JSON file not found: %s", config_json_file)
-            raise exceptions.VmtbConfigError(f'VMTB config JSON file not found: {config_json_file}')
+            raise exceptions.VmtbConfigError(f'VMTB config JSON file not found: {config_json_file}') from exc
 
-        with open(config_json_file, mode='r', encoding='utf-8') as json_file:
+        with json_file:
             try:
-                vgpu_json = json.load(json_file)
+                vgpu_json = json_parser.loads(json_file.read())
             except json.JSONDecodeError as exc:
                 logger.error("Invalid VMTB config JSON format: %s", exc)
                 raise exceptions.VmtbConfigError(f'Invalid VMTB config JSON format: {exc}')
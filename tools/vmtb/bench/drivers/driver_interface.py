@@ -2,6 +2,7 @@
 # Copyright © 2024 Intel Corporation
 
 import abc
+import contextlib
 import enum
 import typing
 
@@ -12,23 +13,26 @@ class SchedulingPriority(enum.Enum):
     HIGH = 2
 
 
-class VfControl(str, enum.Enum):
-    pause = 'pause'
-    resume = 'resume'
-    stop = 'stop'
-    clear = 'clear'
-
-    def __str__(self) -> str:
-        return str.__str__(self)
+class VfControl:
+    # VF control commands, kept as bytes written as-is to the driver interface
+    pause = b'pause'
+    resume = b'resume'
+    stop = b'stop'
+    clear = b'clear'
 
 
 class DriverInterface(abc.ABC):
+    __slots__ = ()
 
     @staticmethod
     @abc.abstractmethod
     def get_name() -> str:
         raise NotImplementedError
 
+    def batch(self) -> typing.ContextManager[None]:
+        """Group attribute writes to be submitted together (no-op if not supported by a driver)."""
+        return contextlib.nullcontext()
+
     @abc.abstractmethod
     def bind(self, bdf: str) -> None:
         raise NotImplementedError
@@ -189,8 +193,17 @@ class DriverInterface(abc.ABC):
     def set_preempt_timeout_us(self, vf_num: int, gt_num: int, val: int) -> None:
         raise NotImplementedError
 
+    def set_quota_vector(self, attr: str, gt_num: int,
+                         vf_values: typing.Iterable[typing.Tuple[int, int]]) -> None:
+        """Set per-function provisioning attribute (ex. 'ggtt_quota') from (function number, value) pairs.
+        Drivers may override it to write all values at once, the default calls set_[attr] for each function.
+        """
+        setter = getattr(self, f'set_{attr}')
+        for vf_num, val in vf_values:
+            setter(vf_num, gt_num, val)
+
     @abc.abstractmethod
-    def set_vf_control(self, vf_num: int, val: VfControl) -> None:
+    def set_vf_control(self, vf_num: int, val: typing.Union[bytes, str]) -> None:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -1,69 +1,182 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import contextlib
 import logging
+import os
+import re
 import typing
-from pathlib import Path
 
 from bench import exceptions
-from bench.drivers.driver_interface import (DriverInterface,
-                                            SchedulingPriority, VfControl)
+from bench.drivers.driver_interface import DriverInterface, SchedulingPriority
 from bench.helpers.log import LogDecorators
 
 logger = logging.getLogger('XeDriver')
 
+# Matches 'total:' and 'avail:' lines of debugfs [attr]_available files
+_AVAILABLE_RE = re.compile(rb'^(total|avail):\s*(\d+)', re.MULTILINE)
+
+# Per-function debugfs attributes supported by the vectorized quota API
+_VF_ATTRS = frozenset(('ggtt_quota', 'lmem_quota', 'contexts_quota', 'doorbells_quota',
+                       'exec_quantum_ms', 'preempt_timeout_us'))
+
 
 class XeDriver(DriverInterface):
+    __slots__ = ('sysfs_card_path', 'debugfs_path', '__pending_writes',
+                 '_totalvfs', '_num_gts', '_has_lmem', '_vf_gt_prefix', '_dir_fds')
+
     def __init__(self, card_index: int) -> None:
-        self.sysfs_card_path = Path(f'/sys/class/drm/card{card_index}')
-        self.debugfs_path = Path(f'/sys/kernel/debug/dri/{card_index}')
+        # Plain string paths - attributes are only opened, so no need for Path objects
+        self.sysfs_card_path = f'/sys/class/drm/card{card_index}/device'
+        self.debugfs_path = f'/sys/kernel/debug/dri/{card_index}'
+        # Writes queued within batch() context (None if not batching)
+        self.__pending_writes: typing.Optional[typing.List[typing.Tuple[str, str, bytes]]] = None
+        # Device invariants, read on first use and invalidated on driver (un)bind
+        self._totalvfs: typing.Optional[int] = None
+        self._num_gts: typing.Optional[int] = None
+        self._has_lmem: typing.Optional[bool] = None
+        # Debugfs gtM/[pf|vfN] directories, built on first use
+        self._vf_gt_prefix: typing.Dict[typing.Tuple[int, int], str] = {}
+        # Directory (O_PATH) descriptors of attribute locations - attributes are opened relative to them
+        self._dir_fds: typing.Dict[str, int] = {}
+
+    def __del__(self) -> None:
+        self.__close_dir_fds()
 
     @staticmethod
     def get_name() -> str:
         return 'xe'
 
+    @contextlib.contextmanager
+    def batch(self) -> typing.Iterator[None]:
+        """Queue sysfs/debugfs writes and submit them together on exit.
+        All queued writes are checked against a single kernel log read, instead of one per attribute.
+        Writes are submitted in order, stopping at the first failure.
+        A failed batch body submits nothing - writes still queued are discarded
+        (writes already submitted by a read within the batch are not reverted).
+        """
+        if self.__pending_writes is not None:
+            # Nested batch - writes are submitted by the outermost one
+            yield
+            return
+
+        self.__pending_writes = []
+        try:
+            yield
+            writes = self.__pending_writes
+        finally:
+            self.__pending_writes = None
+
+        if writes:
+            self.__write_fs_batch(writes)
+
+    def __dir_fd(self, base_path: str) -> int:
+        dir_fd = self._dir_fds.get(base_path)
+        if dir_fd is None:
+            dir_fd = os.open(base_path, os.O_PATH | os.O_DIRECTORY)
+            self._dir_fds[base_path] = dir_fd
+        return dir_fd
+
+    def __close_dir_fds(self) -> None:
+        for dir_fd in self._dir_fds.values():
+            os.close(dir_fd)
+        self._dir_fds.clear()
+
     @LogDecorators.parse_kmsg
-    def __write_fs(self, base_path: Path, name: str, value: str) -> None:
-        path = base_path / name
+    def __write_fs_batch(self, writes: typing.List[typing.Tuple[str, str, bytes]]) -> None:
+        for done, (base_path, name, value) in enumerate(writes):
+            try:
+                # Raw fd I/O relative to a cached directory fd - only the attribute name is resolved
+                fd = os.open(name, os.O_WRONLY | os.O_TRUNC, dir_fd=self.__dir_fd(base_path))
+                try:
+                    os.write(fd, value)
+                finally:
+                    os.close(fd)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Write: %s -> %s/%s", value.decode(), base_path, name)
+            except Exception as exc:
+                path = f'{base_path}/{name}'
+                logger.error("Unable to write %s -> %s", value.decode(), path)
+                if len(writes) > 1:
+                    # Report progress of the batch - earlier writes are applied, later ones not submitted
+                    logger.error("Batch write stopped: %s of %s writes applied, skipped: %s",
+                                 done, len(writes), ', '.join(f'{base}/{attr}' for base, attr, _ in writes[done + 1:]))
+                raise exceptions.HostError(f'Could not write to {path}. Error: {exc}') from exc
+
+    def __write_fs(self, base_path: str, name: str, value: typing.Union[str, bytes]) -> None:
+        data = value.encode() if isinstance(value, str) else value
+        if self.__pending_writes is not None:
+            self.__pending_writes.append((base_path, name, data))
+            return
+
+        self.__write_fs_batch([(base_path, name, data)])
+
+    def __flush_pending_writes(self) -> None:
+        if self.__pending_writes:
+            # Keep the order of operations - submit writes queued so far
+            writes = self.__pending_writes.copy()
+            self.__pending_writes.clear()
+            self.__write_fs_batch(writes)
+
+    def __read_fs(self, base_path: str, name: str) -> str:
+        self.__flush_pending_writes()
+        return self.__read_fs_single(base_path, name)
+
+    def __read_raw(self, base_path: str, name: str) -> bytes:
+        fd = os.open(name, os.O_RDONLY, dir_fd=self.__dir_fd(base_path))
         try:
-            path.write_text(value)
-            logger.debug("Write: %s -> %s", value, path)
-        except Exception as exc:
-            logger.error("Unable to write %s -> %s", value, path)
-            raise exceptions.HostError(f'Could not write to {path}. Error: {exc}') from exc
+            chunks = []
+            # Attributes usually fit in a single read, but debugfs may return partial content
+            while chunk := os.read(fd, 4096):
+                chunks.append(chunk)
+        finally:
+            os.close(fd)
+
+        return b''.join(chunks)
 
     @LogDecorators.parse_kmsg
-    def __read_fs(self,  base_path: Path, name: str) -> str:
-        path = base_path / name
+    def __read_fs_single(self, base_path: str, name: str) -> str:
         try:
-            ret = path.read_text()
+            ret = self.__read_raw(base_path, name).decode()
         except Exception as exc:
-            logger.error("Unable to read %s", path)
-            raise exceptions.HostError(f'Could not read from {path}. Error: {exc}') from exc
+            logger.error("Unable to read %s/%s", base_path, name)
+            raise exceptions.HostError(f'Could not read from {base_path}/{name}. Error: {exc}') from exc
 
-        logger.debug("Read: %s -> %s", path, ret.strip())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Read: %s/%s -> %s", base_path, name, ret.strip())
         return ret
 
     def __write_sysfs(self, name: str, value: str) -> None:
-        self.__write_fs(self.sysfs_card_path / 'device', name, value)
+        self.__write_fs(self.sysfs_card_path, name, value)
 
     def __read_sysfs(self, name: str) -> str:
-        return str(self.__read_fs(self.sysfs_card_path / 'device', name))
+        return str(self.__read_fs(self.sysfs_card_path, name))
+
+    def __write_debugfs(self, prefix: str, attr: str, value: typing.Union[str, bytes]) -> None:
+        self.__write_fs(prefix, attr, value)
 
-    def __write_debugfs(self, name: str, value: str) -> None:
-        self.__write_fs(self.debugfs_path, name, value)
+    def __read_debugfs(self, prefix: str, attr: str) -> str:
+        return str(self.__read_fs(prefix, attr))
 
-    def __read_debugfs(self, name: str) -> str:
-        return str(self.__read_fs(self.debugfs_path, name))
+    def __invalidate_cache(self) -> None:
+        self._totalvfs = None
+        self._num_gts = None
+        self._has_lmem = None
+        # Debugfs directories are recreated on driver (re)bind
+        self.__close_dir_fds()
 
     def bind(self, bdf: str) -> None:
         self.__write_sysfs('driver/bind', bdf)
+        self.__invalidate_cache()
 
     def unbind(self, bdf: str) -> None:
         self.__write_sysfs('driver/unbind', bdf)
+        self.__invalidate_cache()
 
     def get_totalvfs(self) -> int:
-        return int(self.__read_sysfs('sriov_totalvfs'))
+        if self._totalvfs is None:
+            self._totalvfs = int(self.__read_sysfs('sriov_totalvfs'))
+        return self._totalvfs
 
     def get_numvfs(self) -> int:
         return int(self.__read_sysfs('sriov_numvfs'))
@@ -78,22 +191,33 @@ class XeDriver(DriverInterface):
         self.__write_sysfs('sriov_drivers_autoprobe', str(val))
 
     def get_num_gts(self) -> int:
+        if self._num_gts is not None:
+            return self._num_gts
+
         gt_num = 0
         # Fixme: tile0 only at the moment, add support for multiple tiles if needed
-        path = self.sysfs_card_path / 'device' / 'tile0' / 'gt'
+        path = f'{self.sysfs_card_path}/tile0'
 
-        if path.exists():
+        # Count gt/gtN entries with a single directory read instead of stat per GT
+        try:
+            with os.scandir(path) as entries:
+                names = [entry.name for entry in entries if entry.name.startswith('gt')]
+        except FileNotFoundError:
+            names = []
+
+        if 'gt' in names:
             gt_num = 1
         else:
-            while Path(f'{path}{gt_num}').exists():
-                gt_num += 1
+            gt_num = sum(1 for name in names if name[2:].isdigit())
 
+        self._num_gts = gt_num
         return gt_num
 
     def has_lmem(self) -> bool:
-        # XXX: is this a best way to check if LMEM is present?
-        path = self.debugfs_path / 'gt0' / 'pf' / 'lmem_spare'
-        return path.exists()
+        if self._has_lmem is None:
+            # XXX: is this a best way to check if LMEM is present?
+            self._has_lmem = os.path.exists(f'{self.debugfs_path}/gt0/pf/lmem_spare')
+        return self._has_lmem
 
     def get_auto_provisioning(self) -> bool:
         raise exceptions.NotAvailableError('auto_provisioning attribute not available')
@@ -106,50 +230,52 @@ class XeDriver(DriverInterface):
         # Forcing reset (debugfs/gtM/force_reset_sync) shouldn't be used to idle GPU.
         pass
 
-    # Create debugfs path to given parameter (without a base part):
-    # gt@gt_num/[pf|vf@vf_num]/@attr
+    # Get debugfs directory of given function:
+    # [debugfs base path]/gt@gt_num/[pf|vf@vf_num]
     # @vf_num: VF number (1-based) or 0 for PF
     # @gt_num: GT instance number
-    # @subdir: subdirectory for attribute or empty string if not exists
-    # @attr: iov parameter name
-    # Returns: iov debugfs path to @attr
-    def __helper_create_debugfs_path(self, vf_num: int, gt_num: int, subdir: str, attr: str) -> str:
-        vf_gt_part = f'gt{gt_num}/pf' if vf_num == 0 else f'gt{gt_num}/vf{vf_num}'
-        return f'{vf_gt_part}/{subdir}/{attr}'
+    # Returns: iov debugfs directory for attributes of the function
+    def __helper_create_debugfs_path(self, vf_num: int, gt_num: int) -> str:
+        prefix = self._vf_gt_prefix.get((vf_num, gt_num))
+        if prefix is None:
+            function = 'pf' if vf_num == 0 else f'vf{vf_num}'
+            prefix = f'{self.debugfs_path}/gt{gt_num}/{function}'
+            self._vf_gt_prefix[(vf_num, gt_num)] = prefix
+        return prefix
 
     # PF spare resources
     # Debugfs location: [SRIOV debugfs base path]/gtM/pf/xxx_spare
     def get_pf_ggtt_spare(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'ggtt_spare')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'ggtt_spare'))
 
     def set_pf_ggtt_spare(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '',  'ggtt_spare')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'ggtt_spare', str(val))
 
     def get_pf_lmem_spare(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'lmem_spare')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'lmem_spare'))
 
     def set_pf_lmem_spare(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'lmem_spare')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'lmem_spare', str(val))
 
     def get_pf_contexts_spare(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'contexts_spare')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'contexts_spare'))
 
     def set_pf_contexts_spare(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'contexts_spare')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'contexts_spare', str(val))
 
     def get_pf_doorbells_spare(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'doorbells_spare')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'doorbells_spare'))
 
     def set_pf_doorbells_spare(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'doorbells_spare')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'doorbells_spare', str(val))
 
     # PF specific provisioning parameters
     # Debugfs location: [SRIOV debugfs base path]/gtM/pf
@@ -161,29 +287,29 @@ class XeDriver(DriverInterface):
         logger.warning("PF sched_priority param not available")
 
     def get_pf_policy_reset_engine(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'reset_engine')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'reset_engine'))
 
     def set_pf_policy_reset_engine(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'reset_engine')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'reset_engine', str(val))
 
     def get_pf_policy_sample_period_ms(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'sample_period_ms')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'sample_period_ms'))
 
     def set_pf_policy_sample_period_ms(self, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'sample_period_ms')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'sample_period_ms', str(val))
 
     def get_pf_policy_sched_if_idle(self, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'sched_if_idle')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        return int(self.__read_debugfs(path, 'sched_if_idle'))
 
     def set_pf_policy_sched_if_idle(self, gt_num: int, val: int) -> None:
         # In order to set strict scheduling policy, PF scheduling priority needs to be default
-        path = self.__helper_create_debugfs_path(0, gt_num, '', 'sched_if_idle')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(0, gt_num)
+        self.__write_debugfs(path, 'sched_if_idle', str(val))
 
     # VF and PF provisioning parameters
     # Debugfs location: [SRIOV debugfs base path]/gtM/[pf|vfN]
@@ -193,81 +319,96 @@ class XeDriver(DriverInterface):
             logger.warning("PF ggtt_quota not available")
             return 0
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'ggtt_quota')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'ggtt_quota'))
 
     def set_ggtt_quota(self, vf_num: int, gt_num: int, val: int) -> None:
         if vf_num == 0:
             logger.warning("PF ggtt_quota not available")
             return
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'ggtt_quota')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        self.__write_debugfs(path, 'ggtt_quota', str(val))
 
     def get_lmem_quota(self, vf_num: int, gt_num: int) -> int:
         if vf_num == 0:
             logger.warning("PF lmem_quota not available")
             return 0
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'lmem_quota')
-        return int(self.__read_debugfs(path)) if self.has_lmem() else 0
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'lmem_quota')) if self.has_lmem() else 0
 
     def set_lmem_quota(self, vf_num: int, gt_num: int, val: int) -> None:
         if vf_num == 0:
             logger.warning("PF lmem_quota not available")
             return
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'lmem_quota')
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
         if self.has_lmem():
-            self.__write_debugfs(path, str(val))
+            self.__write_debugfs(path, 'lmem_quota', str(val))
 
     def get_contexts_quota(self, vf_num: int, gt_num: int) -> int:
         if vf_num == 0:
             logger.warning("PF contexts_quota not available")
             return 0
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'contexts_quota')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'contexts_quota'))
 
     def set_contexts_quota(self, vf_num: int, gt_num: int, val: int) -> None:
         if vf_num == 0:
             logger.warning("PF contexts_quota not available")
             return
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'contexts_quota')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        self.__write_debugfs(path, 'contexts_quota', str(val))
 
     def get_doorbells_quota(self, vf_num: int, gt_num: int) -> int:
         if vf_num == 0:
             logger.warning("PF doorbells_quota not available")
             return 0
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'doorbells_quota')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'doorbells_quota'))
 
     def set_doorbells_quota(self, vf_num: int, gt_num: int, val: int) -> None:
         if vf_num == 0:
             logger.warning("PF doorbells_quota not available")
             return
 
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'doorbells_quota')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        self.__write_debugfs(path, 'doorbells_quota', str(val))
 
     def get_exec_quantum_ms(self, vf_num: int, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'exec_quantum_ms')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'exec_quantum_ms'))
 
     def set_exec_quantum_ms(self, vf_num: int, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'exec_quantum_ms')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        self.__write_debugfs(path, 'exec_quantum_ms', str(val))
 
     def get_preempt_timeout_us(self, vf_num: int, gt_num: int) -> int:
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'preempt_timeout_us')
-        return int(self.__read_debugfs(path))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        return int(self.__read_debugfs(path, 'preempt_timeout_us'))
 
     def set_preempt_timeout_us(self, vf_num: int, gt_num: int, val: int) -> None:
-        path = self.__helper_create_debugfs_path(vf_num, gt_num, '', 'preempt_timeout_us')
-        self.__write_debugfs(path, str(val))
+        path = self.__helper_create_debugfs_path(vf_num, gt_num)
+        self.__write_debugfs(path, 'preempt_timeout_us', str(val))
+
+    # Vectorized VF provisioning parameters - all writes submitted as a single batch
+    # @attr: one of _VF_ATTRS, PF (vf_num 0) quotas are handled per function by the base class
+    def set_quota_vector(self, attr: str, gt_num: int,
+                         vf_values: typing.Iterable[typing.Tuple[int, int]]) -> None:
+        vf_values = list(vf_values)
+        if attr not in _VF_ATTRS or (attr.endswith('_quota') and any(vf_num == 0 for vf_num, _ in vf_values)):
+            super().set_quota_vector(attr, gt_num, vf_values)
+            return
+        if attr == 'lmem_quota' and not self.has_lmem():
+            return
+
+        with self.batch():
+            for vf_num, val in vf_values:
+                self.__write_debugfs(self.__helper_create_debugfs_path(vf_num, gt_num), attr, str(val))
 
     # Control state of the running VF (WO)
     # Debugfs location: [SRIOV debugfs base path]/gtM/vfN/control
@@ -275,9 +416,9 @@ class XeDriver(DriverInterface):
     # submission requests from given VF and clear provisioning.
     # control: "pause|resume|stop|clear"
     # For debug purposes only.
-    def set_vf_control(self, vf_num: int, val: VfControl) -> None:
-        path = self.__helper_create_debugfs_path(vf_num, 0, '', 'control')
-        self.__write_debugfs(path, val)
+    def set_vf_control(self, vf_num: int, val: typing.Union[bytes, str]) -> None:
+        path = self.__helper_create_debugfs_path(vf_num, 0)
+        self.__write_debugfs(path, 'control', val)
 
     # Read [attribute]_available value from debugfs:
     # /sys/kernel/debug/dri/[card_index]/gt@gt_num/pf/@attr_available
@@ -285,20 +426,15 @@ class XeDriver(DriverInterface):
     # @attr: iov parameter name
     # Returns: total and available size for @attr
     def __helper_get_debugfs_available(self, gt_num: int, attr: str) -> typing.Tuple[int, int]:
-        path = self.debugfs_path / f'gt{gt_num}' / 'pf' / f'{attr}_available'
-        total = available = 0
+        prefix = self.__helper_create_debugfs_path(0, gt_num)
 
-        out = path.read_text()
-        for line in out.splitlines():
-            param, value = line.split(':')
-            value = value.lstrip().split('\t')[0]
-
-            if param == 'total':
-                total = int(value)
-            elif param == 'avail':
-                available = int(value)
-
-        return (total, available)
+        data = self.__read_raw(prefix, f'{attr}_available')
+        values = {m.group(1): int(m.group(2)) for m in _AVAILABLE_RE.finditer(data)}
+        try:
+            return (values[b'total'], values[b'avail'])
+        except KeyError as exc:
+            raise exceptions.HostError(f'Could not parse {prefix}/{attr}_available: '
+                                       f'missing {exc.args[0].decode()} value') from exc
 
     # Resources total availability
     # Debugfs location: [SRIOV debugfs base path]/gtM/pf/
@@ -8,6 +8,7 @@ from bench.machines.machine_interface import ProcessResult
 
 
 class ExecutorInterface(metaclass=abc.ABCMeta):
+    __slots__ = ()
 
     @abc.abstractmethod
     def status(self) -> ProcessResult:
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import concurrent.futures
 import logging
 import re
 import typing
@@ -11,6 +12,10 @@ from bench.machines.machine_interface import DEFAULT_TIMEOUT, MachineInterface
 
 logger = logging.getLogger('GemWsim')
 
+# Parses result line of gem_wsim output ex.: 19.449s elapsed (102.836 workloads/s)
+_RESULT_RE = re.compile(r'(?P<elapsed>\d+(?:\.\d*)?|\.\d+)s elapsed \((?P<wps>\d+(?:\.\d*)?|\.\d+) workloads/s\)',
+                        re.MULTILINE)
+
 
 class GemWsimResult(typing.NamedTuple):
     elapsed_sec: float
@@ -23,6 +28,8 @@ PREEMPT_10MS_WORKLOAD = (f'1.DEFAULT.{int(ONE_CYCLE_DURATION_MS * 1000 / 2)}.0.0
 NON_PREEMPT_10MS_WORKLOAD = f'X.1.0,X.2.0,{PREEMPT_10MS_WORKLOAD}'
 
 class GemWsim(ShellExecutor):
+    __slots__ = ('machine_id',)
+
     def __init__(self, machine: MachineInterface, num_clients: int = 1, num_repeats: int = 1,
                  workload: str = PREEMPT_10MS_WORKLOAD, timeout: int = DEFAULT_TIMEOUT) -> None:
         super().__init__(
@@ -41,9 +48,7 @@ class GemWsim(ShellExecutor):
         proc_result = self.wait()
         if proc_result.exit_code == 0:
             logger.info('%s: %s', self, proc_result.stdout)
-            # Try parse output ex.: 19.449s elapsed (102.836 workloads/s)
-            pattern = r'(?P<elapsed>\d+(\.\d*)?|\.\d+)s elapsed \((?P<wps>\d+(\.\d*)?|\.\d+) workloads/s\)'
-            match = re.search(pattern, proc_result.stdout, re.MULTILINE)
+            match = _RESULT_RE.search(proc_result.stdout)
             if match:
                 return GemWsimResult(float(match.group('elapsed')), float(match.group('wps')))
         raise exceptions.GemWsimError(f'{self}: exit_code: {proc_result.exit_code}'
@@ -57,7 +62,9 @@ def gem_wsim_parallel_exec_and_check(vms: typing.List[MachineInterface], workloa
     for i, wsim in enumerate(wsim_procs):
         assert wsim.is_running(), f'GemWsim failed to start on VM{i}'
 
-    results = [wsim.wait_results() for wsim in wsim_procs]
+    # wait on all VMs concurrently - each wait polls its own guest agent
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(wsim_procs)) as executor:
+        results = list(executor.map(GemWsim.wait_results, wsim_procs))
     if expected is not None:
         assert results[0].elapsed_sec > expected.elapsed_sec * 0.9
         assert results[0].workloads_per_sec > expected.workloads_per_sec * 0.9
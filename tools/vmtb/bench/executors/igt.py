@@ -2,6 +2,7 @@
 # Copyright © 2024 Intel Corporation
 
 import enum
+import functools
 import json
 import logging
 import posixpath
@@ -13,6 +14,11 @@ from bench.executors.shell import ShellExecutor
 from bench.machines.machine_interface import (DEFAULT_TIMEOUT,
                                               MachineInterface, ProcessResult)
 
+try:
+    import orjson as json_parser
+except ImportError: # orjson is optional - fall back to the stdlib parser
+    json_parser = json  # type: ignore[no-redef]
+
 logger = logging.getLogger('IgtExecutor')
 
 
@@ -30,8 +36,28 @@ igt_tests: typing.Dict[IgtType, typing.Tuple[str, str]] = {
     IgtType.SPIN_BATCH: ('igt@gem_spin_batch@legacy', 'igt@xe_spin_batch@spin-basic')
     }
 
+# Flat {(drm driver, IGT type): IGT name} lookup of the above
+_igt_by_driver: typing.Dict[typing.Tuple[str, IgtType], str] = {
+    **{('i915', igt_type): names[0] for igt_type, names in igt_tests.items()},
+    **{('xe', igt_type): names[1] for igt_type, names in igt_tests.items()}
+    }
+
+# IGT results not counted as failures
+_PASS_RESULTS = frozenset(('pass', 'warn', 'dmesg-warn'))
+
+IGT_TESTLIST_PATH = '/tmp/igt_executor.testlist'
+
+
+@functools.lru_cache(maxsize=None)
+def _igt_runner_command(tool_dir: str, options: str, test_dir: str, result_dir: str) -> str:
+    # IGT config is fixed per machine, so the runner command is built once per config
+    runner = posixpath.join(tool_dir, 'igt_runner')
+    return f'{runner} {options} --test-list {IGT_TESTLIST_PATH} {test_dir} {result_dir}'
+
 
 class IgtExecutor(ExecutorInterface):
+    __slots__ = ('igt_config', 'results', 'target', 'igt', 'timeout', 'pid')
+
     def __init__(self, target: MachineInterface,
                  test: typing.Union[str, IgtType],
                  timeout: int = DEFAULT_TIMEOUT) -> None:
@@ -39,14 +65,12 @@ class IgtExecutor(ExecutorInterface):
 
         # TODO ld_library_path not used now, need a way to pass this to guest
         #ld_library_path = f'LD_LIBRARY_PATH={igt_config.lib_dir}'
-        runner = posixpath.join(self.igt_config.tool_dir, 'igt_runner')
-        testlist = '/tmp/igt_executor.testlist'
-        command = f'{runner} {self.igt_config.options} ' \
-                  f'--test-list {testlist} {self.igt_config.test_dir} {self.igt_config.result_dir}'
+        command = _igt_runner_command(self.igt_config.tool_dir, self.igt_config.options,
+                                      self.igt_config.test_dir, self.igt_config.result_dir)
         self.results: typing.Dict[str, typing.Any] = {}
         self.target: MachineInterface = target
-        self.igt: str = test if isinstance(test, str) else self.select_igt_variant(target.get_drm_driver_name(), test)
-        self.target.write_file_content(testlist, self.igt)
+        self.igt: str = test if isinstance(test, str) else select_igt_variant(target.get_drm_driver_name(), test)
+        self.target.write_file_content(IGT_TESTLIST_PATH, self.igt)
         self.timeout: int = timeout
 
         logger.info("[%s] Execute IGT test: %s", target, self.igt)
@@ -75,7 +99,7 @@ class IgtExecutor(ExecutorInterface):
             return self.results
         path = posixpath.join(self.igt_config.result_dir, 'results.json')
         result = self.target.read_file_content(path)
-        self.results = json.loads(result)
+        self.results = json_parser.loads(result)
         return self.results
 
     def did_pass(self) -> bool:
@@ -87,15 +111,10 @@ class IgtExecutor(ExecutorInterface):
         if not aggregate:
             return False
 
-        pass_case = 0
-        fail_case = 0
-        for key in aggregate:
-            if key in ['pass', 'warn', 'dmesg-warn']:
-                pass_case = pass_case + aggregate[key]
-                continue
-            fail_case = fail_case + aggregate[key]
+        fail_case = sum(count for key, count in aggregate.items() if key not in _PASS_RESULTS)
 
-        logger.debug('Full IGT test results:\n%s', json.dumps(results, indent=4))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Full IGT test results:\n%s', json.dumps(results, indent=4))
 
         if fail_case > 0:
             logger.error('Test failed!')
@@ -104,9 +123,13 @@ class IgtExecutor(ExecutorInterface):
         return True
 
     def select_igt_variant(self, driver: str, igt_type: IgtType) -> str:
-        # Select IGT variant dedicated for a given drm driver: xe or i915
-        igt = igt_tests[igt_type]
-        return igt[1] if driver == 'xe' else igt[0]
+        return select_igt_variant(driver, igt_type)
+
+
+def select_igt_variant(driver: str, igt_type: IgtType) -> str:
+    # Select IGT variant dedicated for a given drm driver: xe or i915 (default for non-xe)
+    igt = _igt_by_driver.get((driver, igt_type))
+    return igt if igt is not None else igt_tests[igt_type][0]
 
 
 def igt_list_subtests(target: MachineInterface, test_name: str) -> typing.List[str]:
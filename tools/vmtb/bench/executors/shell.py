@@ -2,6 +2,7 @@
 # Copyright © 2024 Intel Corporation
 
 import signal
+import typing
 
 from bench.executors.executor_interface import ExecutorInterface
 from bench.machines.machine_interface import (DEFAULT_TIMEOUT,
@@ -9,16 +10,28 @@ from bench.machines.machine_interface import (DEFAULT_TIMEOUT,
 
 
 class ShellExecutor(ExecutorInterface):
+    __slots__ = ('target', 'timeout', 'pid', 'result')
+
     def __init__(self, target: MachineInterface, command: str, timeout: int = DEFAULT_TIMEOUT) -> None:
         self.target = target
         self.timeout = timeout
         self.pid = self.target.execute(command)
+        # Final result of the process, kept once exit has been observed
+        self.result: typing.Optional[ProcessResult] = None
 
     def status(self) -> ProcessResult:
-        return self.target.execute_status(self.pid)
+        if self.result is not None:
+            return self.result
+
+        status = self.target.execute_status(self.pid)
+        if status.exited:
+            self.result = status
+        return status
 
     def wait(self) -> ProcessResult:
-        return self.target.execute_wait(self.pid, self.timeout)
+        if self.result is None:
+            self.result = self.target.execute_wait(self.pid, self.timeout)
+        return self.result
 
     def sendsig(self, sig: signal.Signals) -> None:
         self.target.execute_signal(self.pid, sig)
@@ -0,0 +1,41 @@
+# SPDX-License-Identifier: MIT
+# Copyright © 2024 Intel Corporation
+
+import contextlib
+import threading
+import time
+import typing
+
+from bench import exceptions
+
+# Deadline (monotonic clock) of the operation run by the thread - each VM may be driven from its own thread
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def deadline(timeout: float) -> typing.Iterator[None]:
+    """Bound blocking operations of the current thread to timeout seconds.
+    Nested deadlines never extend the enclosing one.
+    """
+    previous: typing.Optional[float] = getattr(_local, 'deadline', None)
+    end = time.monotonic() + timeout
+    _local.deadline = end if previous is None else min(previous, end)
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def remaining(default: typing.Optional[float] = None) -> typing.Optional[float]:
+    """Return seconds left to the current thread deadline, capped by default (returned if there is no deadline).
+    Raise AlarmTimeoutError if the deadline has already passed.
+    """
+    end: typing.Optional[float] = getattr(_local, 'deadline', None)
+    if end is None:
+        return default
+
+    left = end - time.monotonic()
+    if left <= 0:
+        raise exceptions.AlarmTimeoutError('Alarm timeout occured')
+
+    return left if default is None else min(left, default)
@@ -2,6 +2,8 @@
 # Copyright © 2024 Intel Corporation
 
 import logging
+import time
+import typing
 
 from bench.executors.igt import IgtExecutor
 from bench.executors.shell import ShellExecutor
@@ -19,6 +21,17 @@ def driver_check(machine: MachineInterface, card: int = 0) -> bool:
     return True
 
 
+def wait_until(condition: typing.Callable[[], bool], timeout: float, interval: float = 0.1) -> bool:
+    """Poll condition until it is met or timeout [seconds] passes and return its final state."""
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= end:
+            return False
+        time.sleep(interval)
+
+    return True
+
+
 def igt_check(igt_test: IgtExecutor) -> bool:
     ''' Helper/wrapper for wait and check for igt test '''
     igt_out = igt_test.wait()
@@ -2,10 +2,10 @@
 # Copyright © 2024 Intel Corporation
 
 import errno
-import fcntl
 import functools
 import logging
 import os
+import threading
 import typing
 from pathlib import Path
 
@@ -15,19 +15,32 @@ logger = logging.getLogger('Host-kmsg')
 
 HOST_DMESG_FILE = Path("/tmp/vm-test-bench-host_dmesg.log.tmp")
 
+# Max number of buffers accepted by a single writev()
+_IOV_MAX = 1024
+
+# kmsg record priority/facility field (facility * 8 + level, facilities 0..23) -> syslog level
+_KMSG_LEVELS: typing.Dict[bytes, int] = {str(prio).encode(): prio & 0x7 for prio in range(24 * 8)}
+
 
 class LogDecorators():
     """Read and parse kernel log buffer.
     https://www.kernel.org/doc/Documentation/ABI/testing/dev-kmsg
     """
+    # Per-thread /dev/kmsg descriptor - kept open across decorated calls of the main thread,
+    # closed by the outermost call on (short-lived) worker threads
+    _kmsg = threading.local()
+    # Host dmesg log descriptor (append mode) shared by all threads
+    _dmesg_fd: typing.Optional[int] = None
+    _dmesg_lock = threading.Lock()
+
     @staticmethod
-    def read_messages(fd: int) -> typing.List[str]:
+    def read_messages(fd: int) -> typing.List[bytes]:
         buf_size = 4096
         kmsgs = []
         while True:
             try:
                 kmsg = os.read(fd, buf_size)
-                kmsgs.append(kmsg.decode())
+                kmsgs.append(kmsg)
             except OSError as exc:
                 if exc.errno == errno.EAGAIN:
                     break
@@ -39,37 +52,82 @@ class LogDecorators():
         return kmsgs
 
     @staticmethod
-    def parse_messages(kmsgs: typing.List[str]) -> None:
+    def parse_messages(kmsgs: typing.List[bytes]) -> None:
+        debug = logger.isEnabledFor(logging.DEBUG)
         for msg in kmsgs:
-            header, human = msg.split(';', 1)
-            # Get priority/facility field (seq, time, other unused for now)
-            prio_fac, _, _, _ = header.split(',', 3)
-            level = int(prio_fac) & 0x7 # Syslog priority
+            # Raw record: 'prio,seq,time,flags;message' - only the leading priority/facility field
+            # is needed to check a record, the message is split off and decoded only if it is logged
+            prio = msg[:msg.find(b',')]
+            level = _KMSG_LEVELS.get(prio)
+            if level is None:
+                level = int(prio) & 0x7 # Syslog priority
 
             if level <= 2: # KERN_CRIT/ALERT/EMERG
-                logger.error("[Error: %s]: %s", level, human.strip())
-                raise exceptions.HostError(f'Error in dmesg: {human.strip()}')
+                text = msg.partition(b';')[2].decode(errors='replace').strip()
+                logger.error("[Error: %s]: %s", level, text)
+                raise exceptions.HostError(f'Error in dmesg: {text}')
 
-            logger.debug("%s", human.strip())
+            if debug:
+                logger.debug("%s", msg.partition(b';')[2].decode(errors='replace').strip())
+
+    @classmethod
+    def kmsg_state(cls) -> threading.local:
+        """Get /dev/kmsg reader of a current thread, opened (non-blocking) on first use."""
+        if not hasattr(cls._kmsg, 'fd'):
+            cls._kmsg.fd = os.open('/dev/kmsg', os.O_RDONLY | os.O_NONBLOCK)
+            cls._kmsg.depth = 0
+        return cls._kmsg
+
+    @classmethod
+    def release_kmsg_state(cls, kmsg: threading.local) -> None:
+        """Close /dev/kmsg reader of a worker thread once its outermost decorated call returns."""
+        if kmsg.depth == 0 and threading.current_thread() is not threading.main_thread():
+            os.close(kmsg.fd)
+            del kmsg.fd
+
+    @classmethod
+    def dmesg_fd(cls) -> int:
+        """Get host dmesg log descriptor, opened on first use and kept open.
+        The file is expected to be truncated (not removed) to clear it.
+        """
+        if cls._dmesg_fd is None:
+            with cls._dmesg_lock:
+                if cls._dmesg_fd is None:
+                    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC
+                    cls._dmesg_fd = os.open(HOST_DMESG_FILE, flags, 0o644)
+        return cls._dmesg_fd
 
     @classmethod
     def parse_kmsg(cls, func: typing.Callable) -> typing.Callable:
+        """Check kernel messages logged during a decorated call.
+        Messages are drained synchronously in the calling thread on purpose: a critical message
+        must fail the very call that triggered it, which a background reader could not guarantee
+        without reading /dev/kmsg again at the end of each call anyway.
+        """
         @functools.wraps(func)
         def parse_wrapper(*args: typing.Any, **kwargs: typing.Optional[typing.Any]) -> typing.Any:
-            with open('/dev/kmsg', 'r', encoding='utf-8') as f, \
-                 open(HOST_DMESG_FILE, 'a', encoding='utf-8') as dmesg_file:
+            kmsg = cls.kmsg_state()
+            # Skip messages logged before the (outermost) call - nested calls keep reading from there
+            if kmsg.depth == 0:
+                os.lseek(kmsg.fd, 0, os.SEEK_END)
 
-                fd = f.fileno()
-                os.lseek(fd, os.SEEK_SET, os.SEEK_END)
-                flags = fcntl.fcntl(fd, fcntl.F_GETFL)
-                fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
-
-                # Execute actual function
-                result = func(*args, **kwargs)
+            kmsg.depth += 1
+            try:
+                try:
+                    # Execute actual function
+                    result = func(*args, **kwargs)
+                finally:
+                    kmsg.depth -= 1
 
-                kmsgs = cls.read_messages(fd)
-                dmesg_file.writelines(kmsgs)
-                cls.parse_messages(kmsgs)
+                kmsgs = cls.read_messages(kmsg.fd)
+                if kmsgs:
+                    # Records appended with a single syscall (per IOV_MAX records)
+                    dmesg_fd = cls.dmesg_fd()
+                    for i in range(0, len(kmsgs), _IOV_MAX):
+                        os.writev(dmesg_fd, kmsgs[i:i + _IOV_MAX])
+                    cls.parse_messages(kmsgs)
+            finally:
+                cls.release_kmsg_state(kmsg)
 
-                return result
+            return result
         return parse_wrapper
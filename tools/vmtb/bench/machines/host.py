@@ -1,30 +1,88 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import concurrent.futures
+import locale
 import logging
+import os
 import re
-import shlex
+import selectors
 import signal
+import stat
 import subprocess
+import tempfile
 import typing
-from pathlib import Path
 
 from bench import exceptions
 from bench.configurators.vmtb_config import VmtbIgtConfig
 from bench.helpers.log import LogDecorators
 from bench.machines.machine_interface import (DEFAULT_TIMEOUT,
                                               MachineInterface, ProcessResult,
-                                              SuspendMode)
+                                              SuspendMode, split_command)
 from bench.machines.physical.device import Device
 
 logger = logging.getLogger('Host')
 
+# pidfd_open requires Linux 5.3+
+_HAS_PIDFD = hasattr(os, 'pidfd_open')
+# Process output is decoded as in subprocess text mode
+_OUTPUT_ENCODING = locale.getpreferredencoding(False)
+
+
+def _output_sink(name: str) -> int:
+    """Create an anonymous, seekable file for process output.
+    Unlike a pipe, writes to it never block when nobody is reading.
+    """
+    if hasattr(os, 'memfd_create'):
+        return os.memfd_create(name, os.MFD_CLOEXEC)
+
+    fd, path = tempfile.mkstemp(prefix=name)
+    os.unlink(path)
+    return fd
+
+
+def _read_output(fd: int) -> str:
+    chunks: typing.List[bytes] = []
+    os.lseek(fd, 0, os.SEEK_SET)
+    while chunk := os.read(fd, 65536):
+        chunks.append(chunk)
+    # Match universal newlines mode of the former text pipes
+    return b''.join(chunks).decode(_OUTPUT_ENCODING).replace('\r\n', '\n').replace('\r', '\n')
+
+
+class _RunningProcess:
+    """Process started by Host.execute with its stdout/stderr sinks.
+    Once the process exits, the Popen object and output sinks are released and only the final result is kept.
+    """
+    __slots__ = ('proc', 'out_fd', 'err_fd', 'result')
+
+    def __init__(self, proc: subprocess.Popen, out_fd: int, err_fd: int) -> None:
+        self.proc: typing.Optional[subprocess.Popen] = proc
+        self.out_fd = out_fd
+        self.err_fd = err_fd
+        self.result: typing.Optional[ProcessResult] = None
+
+    def finish(self) -> ProcessResult:
+        """Collect a result of the exited process."""
+        if self.result is None:
+            assert self.proc
+            try:
+                self.result = ProcessResult(True, self.proc.returncode,
+                                            _read_output(self.out_fd), _read_output(self.err_fd))
+            finally:
+                os.close(self.out_fd)
+                os.close(self.err_fd)
+                self.proc = None
+        return self.result
+
 
 class Host(MachineInterface):
     def __init__(self) -> None:
-        self.running_procs: typing.Dict[int, subprocess.Popen] = {}
+        self.running_procs: typing.Dict[int, _RunningProcess] = {}
         self.gpu_devices: typing.List[Device] = []
         self.dut_index: int = 0
+        # Host drivers loaded (and devices discovered) - set by load_drivers, reset by unload_drivers
+        self.drivers_loaded: bool = False
         # Initialize in conftest/VmmTestingSetup:
         self.drm_driver_name: str
         self.igt_config: VmtbIgtConfig
@@ -33,61 +91,103 @@ class Host(MachineInterface):
         return f'Host-{self.gpu_devices[self.dut_index].pci_info.bdf}'
 
     @LogDecorators.parse_kmsg
-    def execute(self, command: str) -> int:
-        cmd_arr = shlex.split(command)
+    def execute(self, command: typing.Union[str, typing.Sequence[str]]) -> int:
+        cmd_arr = split_command(command)
         # We don't want to kill the process created here (like 'with' would do) so disable the following linter issue:
         # R1732: consider-using-with (Consider using 'with' for resource-allocating operations)
         # pylint: disable=R1732
         # TODO: but maybe 'subprocess.run' function would fit instead of Popen constructor?
-        process = subprocess.Popen(cmd_arr,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   universal_newlines=True)
+        # Output goes to memfd sinks instead of pipes - the process never stalls on a full pipe buffer,
+        # even if the output is collected only after it exits
+        out_fd = _output_sink('vmtb_out')
+        err_fd = _output_sink('vmtb_err')
+        try:
+            process = subprocess.Popen(cmd_arr, stdout=out_fd, stderr=err_fd)
+        except BaseException:
+            os.close(out_fd)
+            os.close(err_fd)
+            raise
 
-        self.running_procs[process.pid] = process
+        self.running_procs[process.pid] = _RunningProcess(process, out_fd, err_fd)
         logger.debug("Run command: %s (PID: %s)", command, process.pid)
         return process.pid
 
     @LogDecorators.parse_kmsg
     def execute_status(self, pid: int) -> ProcessResult:
-        proc = self.running_procs.get(pid, None)
-        if not proc:
+        running = self.running_procs.get(pid, None)
+        if not running:
             logger.error("No process with PID: %s", pid)
             raise exceptions.HostError(f'No process with PID: {pid}')
 
-        exit_code: typing.Optional[int] = proc.poll()
+        if running.result:
+            return running.result
+
+        assert running.proc
+        exit_code: typing.Optional[int] = running.proc.poll()
         logger.debug("PID %s -> exit code %s", pid, exit_code)
         if exit_code is None:
             return ProcessResult(False, exit_code, '', '')
 
-        out, err = proc.communicate()
-        return ProcessResult(True, exit_code, out, err)
+        return running.finish()
 
     @LogDecorators.parse_kmsg
     def execute_wait(self, pid: int, timeout: int = DEFAULT_TIMEOUT) -> ProcessResult:
-        proc = self.running_procs.get(pid, None)
-        if not proc:
+        running = self.running_procs.get(pid, None)
+        if not running:
             logger.error("No process with PID: %s", pid)
             raise exceptions.HostError(f'No process with PID: {pid}')
 
-        out = ''
-        err = ''
+        if running.result:
+            return running.result
+
+        proc = running.proc
+        assert proc
         try:
-            out, err = proc.communicate(timeout)
+            pidfd = self.__pidfd_open(proc)
+            if pidfd is not None:
+                self.__wait_pidfd(proc, pidfd, timeout)
+            else:
+                proc.wait(timeout)
         except subprocess.TimeoutExpired as exc:
             logger.warning("Timeout (%ss) expired for PID: %s", exc.timeout, pid)
             raise
 
-        return ProcessResult(True, proc.poll(), out, err)
+        return running.finish()
+
+    @staticmethod
+    def __pidfd_open(proc: subprocess.Popen) -> typing.Optional[int]:
+        # Process already reaped (or pidfd not supported) - use a regular wait()
+        if not _HAS_PIDFD or proc.returncode is not None:
+            return None
+        try:
+            return os.pidfd_open(proc.pid)
+        except OSError:
+            return None
+
+    @staticmethod
+    def __wait_pidfd(proc: subprocess.Popen, pidfd: int, timeout: int) -> None:
+        # Event driven wait for the process exit, instead of wait() polling with sleeps.
+        # Output is written to memfd sinks, so there are no pipes to drain meanwhile.
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(pidfd, selectors.EVENT_READ)
+                if not selector.select(timeout):
+                    raise subprocess.TimeoutExpired(proc.args, timeout)
+        finally:
+            os.close(pidfd)
+
+        proc.wait()
 
     @LogDecorators.parse_kmsg
     def execute_signal(self, pid: int, sig: signal.Signals) -> None:
-        proc = self.running_procs.get(pid, None)
-        if not proc:
+        running = self.running_procs.get(pid, None)
+        if not running:
             logger.error("No process with PID: %s", pid)
             raise exceptions.HostError(f'No process with PID: {pid}')
 
-        proc.send_signal(sig)
+        # Process already exited and collected - nothing to signal
+        if running.proc:
+            running.proc.send_signal(sig)
 
     def read_file_content(self, path: str) -> str:
         with open(path, encoding='utf-8') as f:
@@ -99,7 +199,10 @@ class Host(MachineInterface):
             return f.write(content)
 
     def dir_exists(self, path: str) -> bool:
-        return Path(path).is_dir()
+        try:
+            return stat.S_ISDIR(os.stat(path).st_mode)
+        except OSError:
+            return False
 
     def get_drm_driver_name(self) -> str:
         # Used as a part of MachineInterface for helpers
@@ -110,11 +213,10 @@ class Host(MachineInterface):
         return self.igt_config
 
     def is_driver_loaded(self, driver_name: str) -> bool:
-        driver_path = Path('/sys/bus/pci/drivers/') / driver_name
-        return driver_path.exists()
+        return os.path.exists(f'/sys/bus/pci/drivers/{driver_name}')
 
     def is_driver_available(self, driver_name: str) -> bool:
-        modinfo_pid = self.execute(f'modinfo -F filename {driver_name}')
+        modinfo_pid = self.execute(['modinfo', '-F', 'filename', driver_name])
         modinfo_result: ProcessResult = self.execute_wait(modinfo_pid)
         return modinfo_result.exit_code == 0
 
@@ -126,22 +228,38 @@ class Host(MachineInterface):
             logger.warning("VFIO driver: '%s' is not available - use 'vfio-pci'", drivers_to_probe[1])
             drivers_to_probe[1] = 'vfio-pci'
 
+        drivers_to_probe = [driver for driver in drivers_to_probe if not self.is_driver_loaded(driver)]
+        if drivers_to_probe:
+            self.__probe_drivers(drivers_to_probe)
+
+        self.drivers_loaded = True
+
+    def __probe_drivers(self, drivers_to_probe: typing.List[str]) -> None:
+        logger.info("%s driver(s) not loaded - probe modules", ', '.join(drivers_to_probe))
+        # Probe all required modules with a single modprobe call
+        drv_probe_pid = self.execute(['modprobe', '-a', *drivers_to_probe])
+        if self.execute_wait(drv_probe_pid).exit_code == 0:
+            return
+
+        # Probe the modules one by one to find the failing one
         for driver in drivers_to_probe:
-            if not self.is_driver_loaded(driver):
-                logger.info("%s driver is not loaded - probe module", driver)
-                drv_probe_pid = self.execute(f'modprobe {driver}')
-                if self.execute_wait(drv_probe_pid).exit_code != 0:
-                    logger.error("%s driver probe failed!", driver)
-                    raise exceptions.HostError(f'{driver} driver probe failed!')
+            if self.is_driver_loaded(driver):
+                continue
+            drv_probe_pid = self.execute(['modprobe', driver])
+            if self.execute_wait(drv_probe_pid).exit_code != 0:
+                logger.error("%s driver probe failed!", driver)
+                raise exceptions.HostError(f'{driver} driver probe failed!')
 
     def unload_drivers(self) -> None:
         """Unload (remove) host drivers (DRM and VFIO)."""
         logger.debug("Cleanup - unload drivers\n")
+        # Reload (and devices rediscovery) required even if the removal below fails halfway
+        self.drivers_loaded = False
         vfio_driver = f'{self.drm_driver_name}-vfio-pci'
         if not self.is_driver_loaded(vfio_driver):
             vfio_driver = 'vfio-pci'
 
-        rmmod_pid = self.execute(f'modprobe -rf {vfio_driver}')
+        rmmod_pid = self.execute(['modprobe', '-rf', vfio_driver])
         if self.execute_wait(rmmod_pid).exit_code != 0:
             logger.error("VFIO driver remove failed!")
             raise exceptions.HostError('VFIO driver remove failed!')
@@ -150,7 +268,7 @@ class Host(MachineInterface):
             logger.debug("Unbind %s from device %s", self.drm_driver_name, device.pci_info.bdf)
             device.unbind_driver()
 
-        rmmod_pid = self.execute(f'modprobe -rf {self.drm_driver_name}')
+        rmmod_pid = self.execute(['modprobe', '-rf', self.drm_driver_name])
         if self.execute_wait(rmmod_pid).exit_code != 0:
             logger.error("DRM driver remove failed!")
             raise exceptions.HostError('DRM driver remove failed!')
@@ -163,17 +281,34 @@ class Host(MachineInterface):
             logger.error("Unable to discover devices - %s driver is not loaded!", self.drm_driver_name)
             raise exceptions.HostError(f'Unable to discover devices - {self.drm_driver_name} driver is not loaded!')
 
-        detected_devices: typing.List[Device] = []
-        drv_path = Path('/sys/bus/pci/drivers/') / self.drm_driver_name
-
-        # Look for a directory name with a PCI BDF (e.g. 0000:1a:00.0)
-        for dev_bdf_dir in drv_path.glob('*:*:*.[0-7]'):
-            bdf = dev_bdf_dir.name
-            device = Device(bdf, self.drm_driver_name)
-            detected_devices.append(device)
-
-        # Output list of detected devices sorted by an ascending card index (device minor number)
-        self.gpu_devices = sorted(detected_devices, key=lambda dev: dev.pci_info.minor_number)
+        # Walk DRM cards in an ascending card index (device minor number) order, so no sorting of devices is needed
+        # and a card index is known upfront. Primary nodes only (e.g. card0, but not a connector like card0-DP-1).
+        card_indices = sorted(int(name[4:]) for name in os.listdir('/sys/class/drm')
+                              if name.startswith('card') and name[4:].isdigit())
+
+        detected_cards: typing.List[typing.Tuple[str, int]] = []
+        for card_index in card_indices:
+            card_device = f'/sys/class/drm/card{card_index}/device'
+            try:
+                # Only PCI devices bound to the DRM driver (other cards, like simpledrm, are skipped)
+                if os.path.basename(os.readlink(f'{card_device}/driver')) != self.drm_driver_name:
+                    continue
+                # PCI BDF (e.g. 0000:1a:00.0) of the card's parent device
+                bdf = os.path.basename(os.readlink(card_device))
+            except FileNotFoundError:
+                continue
+
+            detected_cards.append((bdf, card_index))
+
+        def init_device(card: typing.Tuple[str, int]) -> Device:
+            return Device(card[0], self.drm_driver_name, card[1])
+
+        # Devices are independent - initialize them concurrently (map keeps the card index order)
+        if len(detected_cards) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(detected_cards)) as executor:
+                self.gpu_devices = list(executor.map(init_device, detected_cards))
+        else:
+            self.gpu_devices = [init_device(card) for card in detected_cards]
 
         if not self.gpu_devices:
             logger.error("GPU PCI device (bound to %s driver) not detected!", self.drm_driver_name)
@@ -189,7 +324,7 @@ class Host(MachineInterface):
         wakeup_delay = 10 # wakeup timer in seconds
         logger.debug("Suspend-resume via rtcwake (mode: %s, wakeup delay: %ss)", mode, wakeup_delay)
 
-        suspend_pid = self.execute(f'rtcwake -s {wakeup_delay} -m {mode}')
+        suspend_pid = self.execute(['rtcwake', '-s', str(wakeup_delay), '-m', str(mode)])
         suspend_result: ProcessResult = self.execute_wait(suspend_pid)
         if suspend_result.exit_code != 0:
             logger.error("Suspend failed - error: %s", suspend_result.stderr)
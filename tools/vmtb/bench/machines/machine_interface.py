@@ -3,6 +3,8 @@
 
 import abc
 import enum
+import re
+import shlex
 import signal
 import typing
 
@@ -11,6 +13,23 @@ from bench.configurators.vmtb_config import VmtbIgtConfig
 DEFAULT_TIMEOUT: int = 1200 # Default machine execution wait timeout in seconds
 
 
+# Characters requiring shell-like (shlex) parsing of a command string
+_SHLEX_SPECIAL = frozenset('\'"\\')
+# Argument separators used by shlex
+_SHLEX_WHITESPACE = re.compile(r'[ \t\r\n]+')
+
+
+def split_command(command: typing.Union[str, typing.Sequence[str]]) -> typing.List[str]:
+    """Return command arguments - a command string is split like by the shell (shlex.split).
+    Strings without quotes and escapes (most of the commands) are split directly on whitespace.
+    """
+    if not isinstance(command, str):
+        return list(command)
+    if _SHLEX_SPECIAL.isdisjoint(command):
+        return [arg for arg in _SHLEX_WHITESPACE.split(command) if arg]
+    return shlex.split(command)
+
+
 class ProcessResult(typing.NamedTuple):
     exited: bool = False
     exit_code: typing.Optional[int] = None
@@ -29,7 +48,7 @@ class SuspendMode(str, enum.Enum):
 class MachineInterface(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
-    def execute(self, command: str) -> int:
+    def execute(self, command: typing.Union[str, typing.Sequence[str]]) -> int:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -1,11 +1,11 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import functools
 import importlib
 import logging
-import re
-from pathlib import Path
-from typing import Any, List
+import os
+from typing import Any, Dict, List, Optional
 
 from bench import exceptions
 from bench.configurators import pci
@@ -18,46 +18,87 @@ from bench.machines.device_interface import DeviceInterface
 logger = logging.getLogger('Device')
 
 
+def _sysfs_read(path: str) -> str:
+    # Raw fd I/O - sysfs attributes are short, skip the buffered text IO stack
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        return os.read(fd, 4096).decode()
+    finally:
+        os.close(fd)
+
+
+def _sysfs_write(path: str, value: str) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CLOEXEC)
+    try:
+        os.write(fd, value.encode())
+    finally:
+        os.close(fd)
+
+
+# PCI device ID never changes for a given BDF
+@functools.lru_cache(maxsize=None)
+def _read_device_id(bdf: str) -> str:
+    devid = _sysfs_read(f'/sys/bus/pci/devices/{bdf}/device')
+    return devid.strip()[2:] # Strip whitespaces and 0x
+
+
+# DRM card index is keyed also by the drm directory mtime, as it is recreated on driver rebind
+@functools.lru_cache(maxsize=32)
+def _find_card_index(bdf: str, drm_dir_mtime_ns: int) -> int:
+    for name in os.listdir(f'/sys/bus/pci/devices/{bdf}/drm'):
+        card_index = name.removeprefix('card')
+        if card_index != name and card_index.isdigit():
+            return int(card_index)
+
+    logger.error("Could not determine card index for device %s", bdf)
+    raise exceptions.HostError(f'Could not determine card index for device {bdf}')
+
+
 class Device(DeviceInterface):
+    # Driver name -> driver class, resolved once per process
+    _driver_class_cache: Dict[str, type] = {}
+
     class PciInfo:
-        def __init__(self, bdf: str) -> None:
+        def __init__(self, bdf: str, minor_number: Optional[int] = None) -> None:
             self.bdf: str = bdf
             self.devid: str = self.get_device_id(self.bdf)
-            self.minor_number: int = self.get_device_minor_number(self.bdf)
+            self.minor_number: int = (minor_number if minor_number is not None
+                                      else self.get_device_minor_number(self.bdf))
 
         def get_device_minor_number(self, bdf: str) -> int:
-            drm_dir = Path('/sys/bus/pci/devices/') / bdf / 'drm'
+            drm_dir = f'/sys/bus/pci/devices/{bdf}/drm'
+            try:
+                drm_dir_mtime_ns = os.stat(drm_dir).st_mtime_ns
+            except FileNotFoundError as exc:
+                logger.error("Could not determine card index for device %s", bdf)
+                raise exceptions.HostError(f'Could not determine card index for device {bdf}') from exc
 
-            for file_path in drm_dir.iterdir():
-                if file_path.match('card*'):
-                    index_match = re.search(r'card(?P<card_index>\d+)', file_path.name)
-                    if index_match:
-                        return int(index_match.group('card_index'))
-
-            logger.error("Could not determine card index for device %s", bdf)
-            raise exceptions.HostError(f'Could not determine card index for device {bdf}')
+            return _find_card_index(bdf, drm_dir_mtime_ns)
 
         def get_device_id(self, bdf: str) -> str:
-            device_file = Path('/sys/bus/pci/devices/') / bdf / 'device'
-            devid = device_file.read_text()
-
-            return devid.strip()[2:] # Strip whitespaces and 0x
+            return _read_device_id(bdf)
 
-    def __init__(self, bdf: str, driver: str) -> None:
-        self.pci_info = self.PciInfo(bdf)
+    def __init__(self, bdf: str, driver: str, minor_number: Optional[int] = None) -> None:
+        self.pci_info = self.PciInfo(bdf, minor_number)
         self.gpu_model: str = pci.get_gpu_model(self.pci_info.devid)
         self.driver: DriverInterface = self.instantiate_driver(driver, self.pci_info.minor_number)
+        # BDFs of enabled VFs (VF number: BDF) - valid until VFs are disabled
+        self.vf_bdfs: Dict[int, str] = {}
 
     def instantiate_driver(self, driver_name: str, card_index: int) -> Any:
-        module_name = f'bench.drivers.{driver_name}'
-        class_name = f'{driver_name.capitalize()}Driver'
+        driver_class = Device._driver_class_cache.get(driver_name)
+        if driver_class is None:
+            module_name = f'bench.drivers.{driver_name}'
+            class_name = f'{driver_name.capitalize()}Driver'
 
-        try:
-            driver_module = importlib.import_module(module_name)
-            driver_class = getattr(driver_module, class_name)
-        except (ImportError, AttributeError) as exc:
-            logging.error("Driver module/class is not available: %s", exc)
-            raise exceptions.VmtbConfigError(f'Requested driver module {driver_name} is not available!')
+            try:
+                driver_module = importlib.import_module(module_name)
+                driver_class = getattr(driver_module, class_name)
+            except (ImportError, AttributeError) as exc:
+                logging.error("Driver module/class is not available: %s", exc)
+                raise exceptions.VmtbConfigError(f'Requested driver module {driver_name} is not available!')
+
+            Device._driver_class_cache[driver_name] = driver_class
 
         return driver_class(card_index)
 
@@ -94,6 +135,7 @@ class Device(DeviceInterface):
         logger.debug("[%s] Disable drivers autoprobe", self.pci_info.bdf)
         self.set_drivers_autoprobe(False)
 
+        self.vf_bdfs.clear()
         self.driver.set_numvfs(num)
         ret = self.driver.get_numvfs()
         assert ret == num
@@ -105,6 +147,7 @@ class Device(DeviceInterface):
         Re-enable SRIOV drivers autoprobe.
         """
         logger.info("[%s] Disable VFs", self.pci_info.bdf)
+        self.vf_bdfs.clear()
         self.driver.set_numvfs(0)
         ret = self.driver.get_numvfs()
         if ret != 0:
@@ -121,19 +164,26 @@ class Device(DeviceInterface):
     def unbind_driver(self) -> None:
         self.driver.unbind(self.pci_info.bdf)
 
-    def override_vf_driver(self, vf_num: int) -> str:
-        """Set VFIO as VF driver."""
-        pci_devices_path = Path('/sys/bus/pci/devices/')
+    def get_vfio_driver_name(self) -> str:
         vfio_driver = f'{self.driver.get_name()}-vfio-pci'
-        if not Path(f'/sys/bus/pci/drivers/{vfio_driver}').exists():
+        if not os.path.exists(f'/sys/bus/pci/drivers/{vfio_driver}'):
             vfio_driver = 'vfio-pci'
+        return vfio_driver
 
-        # virtfnN is a symlink - get the last part of the absolute path, ie. VF BDF like 00:12:00.1
-        # TODO: replace by Path.readlink() when Python 3.9 supported
-        pass_vf_bdf = (pci_devices_path / self.pci_info.bdf / f'virtfn{vf_num - 1}').resolve().name
-        override_path = pci_devices_path / pass_vf_bdf / 'driver_override'
-        override_path.write_text(vfio_driver, encoding='utf-8')
-        logger.debug("VF%s VFIO driver: %s", vf_num, override_path.read_text())
+    def override_vf_driver(self, vf_num: int, vfio_driver: Optional[str] = None) -> str:
+        """Set VFIO as VF driver."""
+        if vfio_driver is None:
+            vfio_driver = self.get_vfio_driver_name()
+
+        pass_vf_bdf = self.vf_bdfs.get(vf_num)
+        if pass_vf_bdf is None:
+            # virtfnN is a symlink to a sibling device directory - its last part is VF BDF like 00:12:00.1
+            pass_vf_bdf = os.path.basename(os.readlink(f'/sys/bus/pci/devices/{self.pci_info.bdf}/virtfn{vf_num - 1}'))
+            self.vf_bdfs[vf_num] = pass_vf_bdf
+        override_path = f'/sys/bus/pci/devices/{pass_vf_bdf}/driver_override'
+        _sysfs_write(override_path, vfio_driver)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("VF%s VFIO driver: %s", vf_num, _sysfs_read(override_path))
 
         return pass_vf_bdf
 
@@ -142,15 +192,30 @@ class Device(DeviceInterface):
         """Provide BDF of VF prepared for pass to VM - with VFIO driver override and probe."""
         pass_vf_bdf = self.override_vf_driver(vf_num)
 
-        drivers_probe = Path('/sys/bus/pci/drivers_probe')
-        drivers_probe.write_text(pass_vf_bdf, encoding='utf-8')
+        _sysfs_write('/sys/bus/pci/drivers_probe', pass_vf_bdf)
 
         logger.info("[%s] VF%s ready for pass to VM", pass_vf_bdf, vf_num)
         return pass_vf_bdf
 
+    @LogDecorators.parse_kmsg
     def get_vfs_bdf(self, *args: int) -> List[str]:
-        vf_list = list(set(args))
-        bdf_list = [self.get_vf_bdf(vf) for vf in vf_list]
+        """Provide BDFs of multiple VFs prepared for pass to VM - overrides first, then probes.
+        All VFs are handled within a single kernel log check.
+        """
+        # Duplicates dropped, but the requested order kept - BDFs are usually matched with VMs by position
+        vf_list = list(dict.fromkeys(args))
+        vfio_driver = self.get_vfio_driver_name()
+        bdf_list = [self.override_vf_driver(vf, vfio_driver) for vf in vf_list]
+
+        # drivers_probe accepts a single BDF per write - reuse one descriptor for all of them
+        fd = os.open('/sys/bus/pci/drivers_probe', os.O_WRONLY | os.O_CLOEXEC)
+        try:
+            for vf_num, pass_vf_bdf in zip(vf_list, bdf_list):
+                os.pwrite(fd, pass_vf_bdf.encode(), 0)
+                logger.info("[%s] VF%s ready for pass to VM", pass_vf_bdf, vf_num)
+        finally:
+            os.close(fd)
+
         return bdf_list
 
     def provision(self, profile: VgpuProfile) -> None:
@@ -159,27 +224,42 @@ class Device(DeviceInterface):
         num_vfs = profile.num_vfs
         num_gts = self.get_num_gts() # Number of tiles (GTs)
         gt_nums = [0] if num_gts == 1 else [0, 1] # Tile (GT) numbers/indexes
+        # Profile sections and driver bound once, not looked up for each attribute write
+        driver = self.driver
+        scheduler = profile.scheduler
+        resources = profile.resources
 
-        for gt_num in gt_nums:
-            self.driver.set_pf_policy_sched_if_idle(gt_num, int(profile.scheduler.scheduleIfIdle))
-            self.driver.set_pf_policy_reset_engine(gt_num, int(profile.security.reset_after_vf_switch))
-            self.driver.set_exec_quantum_ms(0, gt_num, profile.scheduler.pfExecutionQuanta)
-            self.driver.set_preempt_timeout_us(0, gt_num, profile.scheduler.pfPreemptionTimeout)
-            self.driver.set_doorbells_quota(0, gt_num, profile.resources.pfDoorbells)
-            # PF contexts are currently assigned by the driver and cannot be reprovisioned from sysfs
-
-        for vf_num in range(1, num_vfs + 1):
-            if num_gts > 1 and num_vfs > 1:
-                # Multi-tile device Mode 2|3 - odd VFs on GT0, even on GT1
-                gt_nums = [0] if vf_num % 2 else [1]
-
+        # Submit all provisioning writes as a single batch
+        with driver.batch():
             for gt_num in gt_nums:
-                self.driver.set_lmem_quota(vf_num, gt_num, profile.resources.vfLmem)
-                self.driver.set_ggtt_quota(vf_num, gt_num, profile.resources.vfGgtt)
-                self.driver.set_contexts_quota(vf_num, gt_num, profile.resources.vfContexts)
-                self.driver.set_doorbells_quota(vf_num, gt_num, profile.resources.vfDoorbells)
-                self.driver.set_exec_quantum_ms(vf_num, gt_num, profile.scheduler.vfExecutionQuanta)
-                self.driver.set_preempt_timeout_us(vf_num, gt_num, profile.scheduler.vfPreemptionTimeout)
+                driver.set_pf_policy_sched_if_idle(gt_num, int(scheduler.scheduleIfIdle))
+                driver.set_pf_policy_reset_engine(gt_num, int(profile.security.reset_after_vf_switch))
+                driver.set_exec_quantum_ms(0, gt_num, scheduler.pfExecutionQuanta)
+                driver.set_preempt_timeout_us(0, gt_num, scheduler.pfPreemptionTimeout)
+                driver.set_doorbells_quota(0, gt_num, resources.pfDoorbells)
+                # PF contexts are currently assigned by the driver and cannot be reprovisioned from sysfs
+
+            vfs_per_gt: Dict[int, List[int]] = {gt_num: [] for gt_num in gt_nums}
+            for vf_num in range(1, num_vfs + 1):
+                if num_gts > 1 and num_vfs > 1:
+                    # Multi-tile device Mode 2|3 - odd VFs on GT0, even on GT1
+                    vfs_per_gt[0 if vf_num % 2 else 1].append(vf_num)
+                else:
+                    for vf_list in vfs_per_gt.values():
+                        vf_list.append(vf_num)
+
+            vf_attrs = (('lmem_quota', resources.vfLmem),
+                        ('ggtt_quota', resources.vfGgtt),
+                        ('contexts_quota', resources.vfContexts),
+                        ('doorbells_quota', resources.vfDoorbells),
+                        ('exec_quantum_ms', scheduler.vfExecutionQuanta),
+                        ('preempt_timeout_us', scheduler.vfPreemptionTimeout))
+            # Written attribute by attribute (across VFs), not VF by VF - safe, as each VF still gets its attributes
+            # in the same order and VF configs are independent: VFs are provisioned before being enabled (create_vf),
+            # the PF only stores the quotas. On a resource shortage only the VF reported first may differ.
+            for gt_num, vf_nums in vfs_per_gt.items():
+                for attr, val in vf_attrs:
+                    driver.set_quota_vector(attr, gt_num, [(vf_num, val) for vf_num in vf_nums])
 
     # fn_num = 0 for PF, 1..n for VF
     def set_scheduling(self, fn_num: int, gt_num: int, scheduling_config: VgpuSchedulerConfig) -> None:
@@ -211,21 +291,22 @@ class Device(DeviceInterface):
         and restores the auto provisioning mode.
         """
         logger.info("[%s] Reset %s VFs provisioning configuration", self.pci_info.bdf, num_vfs)
-        for gt_num in range(self.get_num_gts()):
-            if self.get_scheduling_priority(gt_num) != SchedulingPriority.LOW:
-                self.set_scheduling_priority(gt_num, SchedulingPriority.LOW)
-            self.driver.set_pf_policy_sched_if_idle(gt_num, 0)
-            self.driver.set_pf_policy_reset_engine(gt_num, 0)
-            self.driver.set_exec_quantum_ms(0, gt_num, 0)
-            self.driver.set_preempt_timeout_us(0, gt_num, 0)
-            self.driver.set_doorbells_quota(0, gt_num, 0)
-            # PF contexts cannot be set from sysfs
-
-            for vf_num in range(1, num_vfs + 1):
-                self.driver.set_contexts_quota(vf_num, gt_num, 0)
-                self.driver.set_doorbells_quota(vf_num, gt_num, 0)
-                self.driver.set_ggtt_quota(vf_num, gt_num, 0)
-                self.driver.set_lmem_quota(vf_num, gt_num, 0)
+        with self.driver.batch():
+            for gt_num in range(self.get_num_gts()):
+                if self.get_scheduling_priority(gt_num) != SchedulingPriority.LOW:
+                    self.set_scheduling_priority(gt_num, SchedulingPriority.LOW)
+                self.driver.set_pf_policy_sched_if_idle(gt_num, 0)
+                self.driver.set_pf_policy_reset_engine(gt_num, 0)
+                self.driver.set_exec_quantum_ms(0, gt_num, 0)
+                self.driver.set_preempt_timeout_us(0, gt_num, 0)
+                self.driver.set_doorbells_quota(0, gt_num, 0)
+                # PF contexts cannot be set from sysfs
+
+                for vf_num in range(1, num_vfs + 1):
+                    self.driver.set_contexts_quota(vf_num, gt_num, 0)
+                    self.driver.set_doorbells_quota(vf_num, gt_num, 0)
+                    self.driver.set_ggtt_quota(vf_num, gt_num, 0)
+                    self.driver.set_lmem_quota(vf_num, gt_num, 0)
 
     def cancel_work(self) -> None:
         """Drop and reset remaining GPU execution at exit."""
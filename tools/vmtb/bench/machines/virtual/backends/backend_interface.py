@@ -23,6 +23,10 @@ class BackendInterface(metaclass=abc.ABCMeta):
     def execute_status(self, pid: int) -> typing.Optional[typing.Dict]:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def execute_wait(self, pid: int) -> typing.Optional[typing.Dict]:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def suspend_disk(self) -> None:
         raise NotImplementedError
@@ -1,54 +1,144 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import itertools
 import json
 import logging
+import os
 import socket
+import threading
+import time
 import typing
 
 from bench import exceptions
+from bench.helpers import deadline
 from bench.machines.virtual.backends.backend_interface import BackendInterface
 
+try:
+    import orjson as json_parser
+except ImportError: # orjson is optional - fall back to the stdlib parser
+    json_parser = json  # type: ignore[no-redef]
+
 logger = logging.getLogger('GuestAgent')
 
 
+def _encode_message(data: typing.Dict) -> bytes:
+    msg = json_parser.dumps(data)
+    return msg if isinstance(msg, bytes) else msg.encode()
+
+
+# Constant commands serialized once
+_QGA_PING = _encode_message({'execute': 'guest-ping', 'arguments': {}})
+_QGA_SUSPEND_RAM = _encode_message({'execute': 'guest-suspend-ram'})
+_QGA_REBOOT = _encode_message({'execute': 'guest-shutdown', 'arguments': {'mode': 'reboot'}})
+_QGA_POWEROFF = _encode_message({'execute': 'guest-shutdown', 'arguments': {'mode': 'powerdown'}})
+_QGA_FILE_WRITE_PREFIX = b'{"execute":"guest-file-write","arguments":{"handle":'
+_QGA_EXEC_STATUS = b'{"execute":"guest-exec-status","arguments":{"pid":%d}}'
+
+# Process status polling interval (seconds) - doubled up to the max while the process runs
+_EXEC_POLL_MIN = 0.01
+_EXEC_POLL_MAX = 1.0
+
+
 class GuestAgentBackend(BackendInterface):
     def __init__(self, socket_path: str, socket_timeout: int) -> None:
         self.sockpath = socket_path
         self.timeout = socket_timeout
-        self.sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock: socket.socket
+        self.sockf: typing.BinaryIO
+        self.__connect()
+        self.__sync_ids = itertools.count(os.getpid() << 16)
+        # Single channel shared by all executors running on the guest - one request/reply at a time
+        self.lock = threading.Lock()
+
+    def __connect(self, timeout: typing.Optional[float] = None) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout if timeout is None else timeout)
         self.sock.connect(self.sockpath)
-        self.sockf: typing.TextIO = self.sock.makefile(mode='rw', errors='strict')
+        # Binary reader - replies are parsed from raw bytes, requests are written directly to the socket
+        self.sockf = self.sock.makefile(mode='rb')
+
+    def __reconnect(self, timeout: float) -> None:
+        """Reopen the channel closed after a timeout and resynchronize it with guest-sync.
+        A late reply to the timed out command may still arrive - replies are skipped until the sync one.
+        Resync is bounded by the timeout of the command that triggered it (deadline of the calling thread).
+        """
+        logger.info('Reconnect guest agent channel %s', self.sockpath)
+        self.__connect(timeout)
+        sync_id = next(self.__sync_ids)
+        self.sock.sendall(_encode_message({'execute': 'guest-sync', 'arguments': {'id': sync_id}}))
+        while True:
+            out = self.sockf.readline()
+            if not out:
+                raise exceptions.GuestAgentError(f'Guest agent channel {self.sockpath} closed on sync')
+            try:
+                if json_parser.loads(out).get('return') == sync_id:
+                    return
+            except ValueError:
+                continue
 
     def __send(self, command: str, arguments: typing.Optional[typing.Dict] = None) -> typing.Dict:
         if arguments is None:
             arguments = {}
 
         data = {'execute': command, 'arguments': arguments}
-        json.dump(data, self.sockf)
-        self.sockf.flush()
-        try:
-            out: typing.Optional[str] = self.sockf.readline()
-        except socket.timeout as soc_to_exc:
-            logger.error('Socket readline timeout on command %s', command)
-            self.sock.close()
-            self.sockf.close()
-            raise exceptions.GuestAgentError(f'Socket timed out on {command}') from soc_to_exc
-        if out is None:
-            logger.error('Command %s, args %s returned with no output')
-            raise exceptions.GuestAgentError(f'Command {command} did not retunrned output')
+        return self.__exchange(command, _encode_message(data))
+
+    def __sendall(self, buffers: typing.Sequence[bytes]) -> None:
+        """Send message parts with gathering writes - no concatenated copy of a (large) message is built."""
+        views = [memoryview(buf) for buf in buffers]
+        while views:
+            sent = self.sock.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            if sent:
+                views[0] = views[0][sent:]
+
+    def __exchange(self, command: str, *payload: bytes) -> typing.Dict:
+        """Send a request (message given in one or more parts) and read its reply."""
+        return self.__exchange_replies(command, payload, 1)[0]
+
+    def __exchange_replies(self, command: str, payload: typing.Sequence[bytes], count: int) -> typing.List[typing.Dict]:
+        """Send requests (messages given in one or more parts) within a single write and read their replies.
+        Agent handles requests in order - the replies are read back in the order of requests.
+        """
+        with self.lock:
+            # Socket timeout shortened to the deadline of the calling thread (if any)
+            timeout = deadline.remaining(self.timeout)
+            try:
+                # Channel closed by the previous timeout - reopened lazily on the next command
+                if self.sockf.closed:
+                    self.__reconnect(timeout)
+                self.sock.settimeout(timeout)
+                self.__sendall(payload)
+                outs: typing.List[bytes] = [self.sockf.readline() for _ in range(count)]
+            except socket.timeout as soc_to_exc:
+                self.sock.close()
+                self.sockf.close()
+                if timeout < self.timeout:
+                    raise exceptions.AlarmTimeoutError(f'Alarm timeout occured on {command}') from soc_to_exc
+                logger.error('Socket readline timeout on command %s', command)
+                raise exceptions.GuestAgentError(f'Socket timed out on {command}') from soc_to_exc
+
+        replies: typing.List[typing.Dict] = []
+        for out in outs:
+            if not out:
+                logger.error('Command %s returned no output', command)
+                raise exceptions.GuestAgentError(f'Command {command} did not return output')
+
+            ret: typing.Dict = json_parser.loads(out)
             # Only logging errors for now
-        ret: typing.Dict = json.loads(out)
-        if 'error' in ret.keys():
-            logger.error('Command: %s got error %s', command, ret)
+            if 'error' in ret:
+                logger.error('Command %s returned error %s', command, ret['error'])
+            replies.append(ret)
 
-        return ret
+        return replies
 
     def sync(self, idnum: int) -> typing.Dict:
         return self.__send('guest-sync', {'id': idnum})
 
     def ping(self) -> typing.Optional[typing.Dict]:
-        return self.__send('guest-ping')
+        return self.__exchange('guest-ping', _QGA_PING)
 
     def execute(self, command: str, args: typing.Optional[typing.List[str]] = None) -> typing.Dict:
         if args is None:
@@ -57,33 +147,43 @@ class GuestAgentBackend(BackendInterface):
         return self.__send('guest-exec', arguments)
 
     def execute_status(self, pid: int) -> typing.Dict:
-        return self.__send('guest-exec-status', {'pid': pid})
+        return self.__exchange('guest-exec-status', _QGA_EXEC_STATUS % pid)
+
+    def execute_wait(self, pid: int) -> typing.Dict:
+        """Poll process status until it exits (or status is not returned) and return the final one.
+        Polling interval starts short and backs off - quick commands finish within milliseconds.
+        """
+        delay = _EXEC_POLL_MIN
+        while True:
+            out = self.execute_status(pid)
+            status = out.get('return')
+            if not status or status.get('exited'):
+                return out
+
+            time.sleep(deadline.remaining(delay))
+            delay = min(delay * 2, _EXEC_POLL_MAX)
 
     # TODO add qmp-query mechanism for all powerstate changes
     def suspend_disk(self) -> None:
         # self.__send('guest-suspend-disk')
         raise NotImplementedError
 
+    def __submit_no_reply(self, payload: bytes) -> None:
+        # Command does not return anything - ping submitted within the same write
+        # confirms the agent is responsive, still in a single round trip
+        self.__exchange('guest-ping', _QGA_PING, payload)
+
     def suspend_ram(self) -> None:
-        self.ping()
         # guest-suspend-ram does not return anything, thats why no __send
-        data = {'execute': 'guest-suspend-ram'}
-        json.dump(data, self.sockf)
-        self.sockf.flush()
+        self.__submit_no_reply(_QGA_SUSPEND_RAM)
 
     def reboot(self) -> None:
-        self.ping()
         # guest-shutdown does not return anything, thats why no __send
-        data = {'execute': 'guest-shutdown', 'arguments': {'mode': 'reboot'}}
-        json.dump(data, self.sockf)
-        self.sockf.flush()
+        self.__submit_no_reply(_QGA_REBOOT)
 
     def poweroff(self) -> None:
-        self.ping()
         # guest-shutdown does not return anything, thats why no __send
-        data = {'execute': 'guest-shutdown', 'arguments': {'mode': 'powerdown'}}
-        json.dump(data, self.sockf)
-        self.sockf.flush()
+        self.__submit_no_reply(_QGA_POWEROFF)
         # self.sockf.readline()
 
     def guest_file_open(self, path: str, mode: str) -> typing.Dict:
@@ -92,8 +192,36 @@ class GuestAgentBackend(BackendInterface):
     def guest_file_close(self, handle: int) -> typing.Dict:
         return self.__send('guest-file-close', {'handle': handle})
 
-    def guest_file_write(self, handle: int, content: str) -> typing.Dict:
-        return self.__send('guest-file-write', {'handle': handle, 'buf-b64': content})
-
-    def guest_file_read(self, handle: int) -> typing.Dict:
-        return self.__send('guest-file-read', {'handle': handle})
+    def guest_file_write(self, handle: int, content: typing.Union[bytes, str]) -> typing.Dict:
+        """Write base64 encoded content to the guest file.
+        Base64 needs no JSON escaping - the payload is inserted into the message as is, not serialized.
+        """
+        if isinstance(content, str):
+            content = content.encode('ascii')
+        return self.__exchange('guest-file-write', b'%s%d,"buf-b64":"' % (_QGA_FILE_WRITE_PREFIX, int(handle)),
+                               content, b'"}}')
+
+    def guest_file_write_chunks(self, handle: int, chunks: typing.Sequence[bytes]) -> typing.List[typing.Dict]:
+        """Write base64 encoded chunks to the guest file with pipelined writes, in a single round trip."""
+        prefix = b'%s%d,"buf-b64":"' % (_QGA_FILE_WRITE_PREFIX, int(handle))
+        payload: typing.List[bytes] = []
+        for chunk in chunks:
+            payload += (prefix, chunk, b'"}}')
+        return self.__exchange_replies('guest-file-write', payload, len(chunks))
+
+    def guest_file_read(self, handle: int, count: typing.Optional[int] = None) -> typing.Dict:
+        arguments: typing.Dict = {'handle': handle}
+        if count is not None:
+            arguments['count'] = count
+        return self.__send('guest-file-read', arguments)
+
+    def guest_file_read_batch(self, handle: int, count: int,
+                              chunk_size: typing.Optional[int] = None) -> typing.List[typing.Dict]:
+        """Read the next count chunks (of chunk_size bytes or the agent default) in a single round trip.
+        Reads past the end of file return empty chunks flagged with eof.
+        """
+        arguments: typing.Dict = {'handle': handle}
+        if chunk_size is not None:
+            arguments['count'] = chunk_size
+        request = _encode_message({'execute': 'guest-file-read', 'arguments': arguments})
+        return self.__exchange_replies('guest-file-read', [request] * count, count)
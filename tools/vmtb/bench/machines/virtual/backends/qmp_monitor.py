@@ -1,16 +1,119 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import concurrent.futures
+import functools
+import itertools
 import json
 import logging
 import queue
+import selectors
 import socket
 import threading
 import time
 import typing
+from dataclasses import dataclass
+
+from bench import exceptions
+from bench.helpers import deadline
+
+try:
+    import orjson as json_parser
+except ImportError: # orjson is optional - fall back to the stdlib parser
+    json_parser = json  # type: ignore[no-redef]
 
 logger = logging.getLogger('QmpMonitor')
 
+# Upper bound of a single (incomplete) QMP message buffered by the reader
+_QMP_MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+def _encode_message(data: typing.Dict) -> bytes:
+    msg = json_parser.dumps(data)
+    return msg if isinstance(msg, bytes) else msg.encode()
+
+
+@functools.lru_cache(maxsize=None)
+def _command_prefix(command: str) -> bytes:
+    """Serialized command without arguments, open for the id field - only the id differs between calls."""
+    return _encode_message({'execute': command})[:-1] + b', "id": '
+
+
+# QMP command name (without arguments) or a complete command message
+QmpCommand = typing.Union[str, typing.Dict]
+
+
+@dataclass(slots=True)
+class QmpEvent:
+    """Asynchronous QMP event - only fields used by the bench are kept."""
+    event: str
+    status: str # Job status of JOB_STATUS_CHANGE event
+
+
+class _QmpReader():
+    """Single thread reading QMP output of all monitors (VMs).
+    Monitor sockets are multiplexed by one selector instead of a blocking reader thread per VM.
+    Received data is split into lines and parsed messages are passed to the monitor message handler
+    (None when the monitor socket is closed).
+    """
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.selector: typing.Optional[selectors.BaseSelector] = None
+
+    def register(self, sock: socket.socket, handler: typing.Callable[[typing.Optional[typing.Dict]], None]) -> None:
+        with self.lock:
+            if self.selector is None:
+                self.selector = selectors.DefaultSelector()
+                threading.Thread(target=self.__run, args=(self.selector,), name='QmpReader', daemon=True).start()
+            # Sockets registered while the reader already waits are picked up by epoll as well
+            self.selector.register(sock, selectors.EVENT_READ, (bytearray(), handler))
+
+    @staticmethod
+    def __run(selector: selectors.BaseSelector) -> None:
+        # Sockets are read one at a time - all of them share a single receive area
+        chunk = bytearray(65536)
+        chunk_view = memoryview(chunk)
+        while True:
+            for key, _ in selector.select():
+                sock: socket.socket = key.fileobj # type: ignore[assignment]
+                buf, handler = key.data
+                try:
+                    size = sock.recv_into(chunk)
+                except OSError:
+                    size = 0
+                if not size:
+                    # Monitor socket closed (VM terminated)
+                    selector.unregister(sock)
+                    handler(None)
+                    continue
+
+                buf += chunk_view[:size]
+                # Split all complete lines of the buffer first and drop them at once
+                start = 0
+                while (end := buf.find(b'\n', start)) >= 0:
+                    line = buf[start:end + 1]
+                    start = end + 1
+                    if line.isspace():
+                        continue
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug('[QMP RSP] <- %s', line.decode(errors='replace').rstrip())
+                    # Reader thread is shared by all monitors - a malformed message must not stop it
+                    try:
+                        qmp_msg = json_parser.loads(line)
+                    except ValueError as exc:
+                        logger.error('Invalid QMP message: %s (%s)', line.decode(errors='replace').rstrip(), exc)
+                        continue
+                    handler(qmp_msg)
+                del buf[:start]
+
+                if len(buf) > _QMP_MAX_MESSAGE_SIZE:
+                    # Not a QMP stream - drop the partial message rather than buffer it indefinitely
+                    logger.error('QMP message exceeds %s bytes - discarded', _QMP_MAX_MESSAGE_SIZE)
+                    buf.clear()
+
+
+_qmp_reader = _QmpReader()
+
 
 class QmpMonitor():
     def __init__(self, socket_path: str, socket_timeout: int) -> None:
@@ -18,144 +121,199 @@ class QmpMonitor():
         self.timeout = socket_timeout
         self.sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.sock.connect(self.sockpath)
-        self.sockf: typing.TextIO = self.sock.makefile(mode='rw', errors='strict')
-        self.qmp_queue: queue.Queue = queue.Queue()
-        self.monitor_thread: threading.Thread = threading.Thread(target=self.__queue_qmp_output,
-                                                                 args=(self.sockf, self.qmp_queue),
-                                                                 daemon=True)
-        self.monitor_thread.start()
+        # Asynchronous events (QmpEvent) only - command replies are matched to commands by id
+        self.qmp_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__command_ids = itertools.count(1)
+        self.__pending_replies: typing.Dict[int, concurrent.futures.Future] = {}
+        self.__closed = False
+        # Block device node name used for VM state snapshots (resolved on first use)
+        self.__snapshot_node: str = ''
+        # Job ids have to be unique only within the QEMU process
+        self.__job_ids = itertools.count()
+        # QMP output is read by a shared reader, messages are written directly to the socket
+        _qmp_reader.register(self.sock, self.__handle_message)
         # It is required to enable capabilities before using QMP
         self.__enable_qmp_capabilities()
 
-    def __enable_qmp_capabilities(self) -> None:
-        json.dump({'execute': 'qmp_capabilities'}, self.sockf)
-        self.sockf.flush()
+    def __handle_message(self, qmp_msg: typing.Optional[typing.Dict]) -> None:
+        if qmp_msg is None:
+            # Monitor closed - fail commands still waiting for a reply
+            self.__closed = True
+            for reply in list(self.__pending_replies.values()):
+                reply.set_exception(exceptions.GuestError(f'QMP monitor {self.sockpath} closed'))
+            self.__pending_replies.clear()
+        elif 'id' in qmp_msg:
+            reply = self.__pending_replies.pop(qmp_msg['id'], None)
+            if reply:
+                reply.set_result(qmp_msg)
+        elif 'event' in qmp_msg:
+            self.qmp_queue.put(QmpEvent(qmp_msg['event'], qmp_msg.get('data', {}).get('status', '')))
+
+    def __write(self, *msgs: QmpCommand, reply: typing.Optional[concurrent.futures.Future] = None) -> int:
+        """Submit commands (several messages with a single write), each tagged with a unique id.
+        A command is either a name (command without arguments) or a complete message dict.
+        Reply to the last one is delivered to the given future. Returns id of the last command.
+        """
+        payload: typing.List[bytes] = []
+        for msg in msgs:
+            msg_id = next(self.__command_ids)
+            if isinstance(msg, str):
+                payload.append(b'%s%d}' % (_command_prefix(msg), msg_id))
+            else:
+                payload.append(_encode_message({**msg, 'id': msg_id}))
+
+        if reply:
+            if self.__closed:
+                raise exceptions.GuestError(f'QMP monitor {self.sockpath} closed')
+            # Registered before the write - reply may arrive right after it
+            self.__pending_replies[msg_id] = reply
+        self.sock.sendall(b''.join(payload))
+        return msg_id
+
+    def __request(self, *msgs: QmpCommand) -> typing.Any:
+        """Submit commands and wait for a reply to the last one - return its result."""
+        # Reply wait shortened to the deadline of the calling thread (if any)
+        timeout = deadline.remaining(self.timeout)
+        reply: concurrent.futures.Future = concurrent.futures.Future()
+        msg_id = self.__write(*msgs, reply=reply)
+        command = msgs[-1] if isinstance(msgs[-1], str) else msgs[-1]['execute']
+        try:
+            qmp_msg: typing.Dict = reply.result(timeout)
+        except concurrent.futures.TimeoutError as exc:
+            self.__pending_replies.pop(msg_id, None)
+            if timeout < self.timeout:
+                raise exceptions.AlarmTimeoutError(f'Alarm timeout occured on QMP command {command}') from exc
+            logger.error('QMP command %s: no reply within %ss', command, self.timeout)
+            raise exceptions.GuestError(f'QMP command {command}: no reply within {self.timeout}s') from exc
+
+        if 'error' in qmp_msg:
+            logger.error('QMP command %s failed: %s', command, qmp_msg['error'])
+            raise exceptions.GuestError(f'QMP command {command} failed: {qmp_msg["error"]}')
+
+        return qmp_msg.get('return')
 
-    def __queue_qmp_output(self, out: typing.TextIO, q: queue.Queue) -> None:
-        for line in iter(out.readline, ''):
-            logger.debug('[QMP RSP] <- %s', line)
-            qmp_msg = json.loads(line)
-            q.put(qmp_msg)
+    def __enable_qmp_capabilities(self) -> None:
+        self.__write('qmp_capabilities')
 
     @property
-    def monitor_queue(self) -> queue.Queue:
+    def monitor_queue(self) -> queue.SimpleQueue:
         return self.qmp_queue
 
-    def query_status(self) -> str:
-        json.dump({'execute': 'query-status'}, self.sockf)
-        self.sockf.flush()
-
-        ret: typing.Dict = {}
-        while 'status' not in ret:
-            qmp_msg = self.qmp_queue.get()
-            if 'return' in qmp_msg:
-                ret = qmp_msg.get('return')
+    def query_status(self, *commands: str) -> str:
+        """Query VM run status.
+        Commands (without arguments) passed are submitted ahead of the query, within the same write.
+        """
+        ret: typing.Dict = self.__request(*commands, 'query-status')
 
         status: str = ret['status']
         logger.debug('Machine status: %s', status)
         return status
 
     def query_jobs(self, requested_type: str) -> typing.Tuple[str, str]:
-        json.dump({'execute': 'query-jobs'}, self.sockf)
-        self.sockf.flush()
+        ret: typing.List[typing.Dict] = self.__request('query-jobs')
 
         job_type: str = ''
         job_status: str = ''
         job_error: str = ''
-        ret: typing.Dict = {}
 
-        qmp_msg = self.qmp_queue.get()
-        # logger.debug('[QMP RSP Queue] -> %s', qmp_msg)
-        if 'return' in qmp_msg:
-            ret = qmp_msg.get('return')
-            for param in ret:
-                job_type = param.get('type')
-                job_status = param.get('status')
-                job_error = param.get('error')
+        for param in ret:
+            job_type = param.get('type')
+            job_status = param.get('status')
+            job_error = param.get('error')
 
-                if job_type == requested_type:
-                    break
+            if job_type == requested_type:
+                break
 
         return (job_status, job_error)
 
+    def __next_event(self) -> QmpEvent:
+        # Blocks until the deadline of the calling thread (if any)
+        try:
+            return self.qmp_queue.get(timeout=deadline.remaining())
+        except queue.Empty as exc:
+            raise exceptions.AlarmTimeoutError('Alarm timeout occured waiting for QMP event') from exc
+
     def get_qmp_event(self) -> str:
-        qmp_msg = self.qmp_queue.get()
-        # logger.debug('[QMP RSP Queue] -> %s', qmp_msg)
-        event: str = qmp_msg.get('event', '')
-        return event
+        qmp_event: QmpEvent = self.__next_event()
+        return qmp_event.event
 
     def get_qmp_event_job(self) -> str:
-        qmp_msg = self.qmp_queue.get()
-        # logger.debug('[QMP RSP Queue] -> %s', qmp_msg)
+        qmp_event: QmpEvent = self.__next_event()
 
         status: str = ''
-        if qmp_msg.get('event') == 'JOB_STATUS_CHANGE':
-            status = qmp_msg.get('data', {}).get('status', '')
+        if qmp_event.event == 'JOB_STATUS_CHANGE':
+            status = qmp_event.status
 
         return status
 
+    def wait_for_event(self, event: str, count: int = 1) -> None:
+        """Wait until the event is received count times - other events are discarded."""
+        while count:
+            if self.__next_event().event == event:
+                count -= 1
+
+    def wait_for_job_status(self, status: str) -> None:
+        """Wait for a job status change to the status - other events are discarded."""
+        while True:
+            qmp_event = self.__next_event()
+            if qmp_event.event == 'JOB_STATUS_CHANGE' and qmp_event.status == status:
+                return
+
     def system_reset(self) -> None:
-        json.dump({'execute': 'system_reset'}, self.sockf)
-        self.sockf.flush()
+        self.__write('system_reset')
 
     def system_wakeup(self) -> None:
-        json.dump({'execute': 'system_wakeup'}, self.sockf)
-        self.sockf.flush()
+        self.__write('system_wakeup')
 
     def stop(self) -> None:
-        json.dump({'execute': 'stop'}, self.sockf)
-        self.sockf.flush()
+        self.__write('stop')
 
     def cont(self) -> None:
-        json.dump({'execute': 'cont'}, self.sockf)
-        self.sockf.flush()
+        self.__write('cont')
 
     def quit(self) -> None:
-        json.dump({'execute': 'quit'}, self.sockf)
-        self.sockf.flush()
+        self.__write('quit')
 
     def __query_snapshot(self) -> typing.Tuple[str, str]:
-        json.dump({'execute': 'query-named-block-nodes'}, self.sockf)
-        self.sockf.flush()
+        ret: typing.List[typing.Dict] = self.__request('query-named-block-nodes')
 
         node_name: str = ''
         snapshot_tag: str = ''
-        ret: typing.Dict = {}
-
-        qmp_msg = self.qmp_queue.get()
-        # logger.debug('[QMP RSP Queue] -> %s', qmp_msg)
-        if 'return' in qmp_msg:
-            ret = qmp_msg.get('return')
-            for block in ret:
-                if block.get('drv') == 'qcow2':
-                    node_name = block.get('node-name')
-                    # Get the most recent state snapshot from the snapshots list:
-                    snapshots = block.get('image').get('snapshots')
-                    if snapshots:
-                        snapshot_tag = snapshots[-1].get('name')
-                    break
 
+        for block in ret:
+            if block.get('drv') == 'qcow2':
+                node_name = block.get('node-name')
+                # Get the most recent state snapshot from the snapshots list:
+                snapshots = block.get('image').get('snapshots')
+                if snapshots:
+                    snapshot_tag = snapshots[-1].get('name')
+                break
+
+        self.__snapshot_node = node_name
         return (node_name, snapshot_tag)
 
+    def __get_snapshot_node(self) -> str:
+        # qcow2 block device node does not change for a VM lifetime - query it only once
+        if not self.__snapshot_node:
+            self.__query_snapshot()
+        return self.__snapshot_node
+
     def save_snapshot(self) -> None:
-        job_id: str = f'savevm_{time.time()}'
-        snapshot_tag = f'vm_state_{time.time()}'
-        node_name, _ = self.__query_snapshot()
+        job_id: str = f'savevm_{next(self.__job_ids)}'
+        # Tag is stored in the image, so it has to be unique also across QEMU runs
+        snapshot_tag = f'vm_state_{time.time_ns()}'
+        node_name = self.__get_snapshot_node()
         logger.debug('[QMP snapshot-save] snapshot_tag: %s, block device node: %s', snapshot_tag, node_name)
 
         # Note: command 'snapshot-save' is supported since QEMU 6.0
-        json.dump({'execute': 'snapshot-save',
-            'arguments': {'job-id': job_id, 'tag': snapshot_tag, 'vmstate': node_name, 'devices': [node_name]}},
-            self.sockf)
-        self.sockf.flush()
+        self.__write({'execute': 'snapshot-save',
+            'arguments': {'job-id': job_id, 'tag': snapshot_tag, 'vmstate': node_name, 'devices': [node_name]}})
 
     def load_snapshot(self) -> None:
-        job_id: str = f'loadvm_{time.time()}'
+        job_id: str = f'loadvm_{next(self.__job_ids)}'
         node_name, snapshot_tag = self.__query_snapshot()
         logger.debug('[QMP snapshot-load] snapshot_tag: %s, block device node: %s', snapshot_tag, node_name)
 
         # Note: command 'snapshot-load' is supported since QEMU 6.0
-        json.dump({'execute': 'snapshot-load',
-            'arguments': {'job-id': job_id, 'tag': snapshot_tag, 'vmstate': node_name, 'devices': [node_name]}},
-            self.sockf)
-        self.sockf.flush()
+        self.__write({'execute': 'snapshot-load',
+            'arguments': {'job-id': job_id, 'tag': snapshot_tag, 'vmstate': node_name, 'devices': [node_name]}})
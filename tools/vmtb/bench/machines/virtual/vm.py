@@ -2,37 +2,142 @@
 # Copyright © 2024 Intel Corporation
 
 import base64
+import fcntl
 import json
 import logging
 import os
 import posixpath
-import shlex
+import selectors
 import signal
 import subprocess
 import threading
 import time
 import typing
-from types import FrameType
 
 from bench import exceptions
 from bench.configurators.vmtb_config import VmtbIgtConfig
+from bench.helpers import deadline
 from bench.machines.machine_interface import (DEFAULT_TIMEOUT,
                                               MachineInterface, ProcessResult,
-                                              SuspendMode)
+                                              SuspendMode, split_command)
 from bench.machines.virtual.backends.guestagent import GuestAgentBackend
 from bench.machines.virtual.backends.qmp_monitor import QmpMonitor
 
 logger = logging.getLogger('VirtualMachine')
 
+# Guest file read chunk size (agent default is 4 KiB) and number of chunks requested per agent round trip
+_FILE_READ_CHUNK = 4 * 1024 * 1024
+_FILE_READ_BATCH = 8
+# Size of the guest file content sent in a single write request
+_FILE_WRITE_CHUNK = 4 * 1024 * 1024
+
+# Size of a single read of QEMU output and requested QEMU output pipe capacity
+_QEMU_OUTPUT_READ_SIZE = 65536
+_QEMU_OUTPUT_PIPE_SIZE = 1024 * 1024
+
+# QEMU sockets polling interval (seconds) - doubled up to the max until the sockets are created
+_SOCKET_POLL_MIN = 0.01
+_SOCKET_POLL_MAX = 0.25
+
+# Image header magic of the formats recognized without running qemu-img
+_IMAGE_FORMAT_MAGIC = {b'QFI\xfb': 'qcow2', b'QED\x00': 'qed', b'KDMV': 'vmdk'}
+
+# Size unit suffixes (as reported by self_config) and their multipliers
+_UNIT_MULTIPLIERS = {'B': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3}
+
+
+def _convert_units_to_bytes(size_str: str) -> int:
+    # Only the unit suffix is case-insensitive - no copy of the whole string is made
+    multiplier = _UNIT_MULTIPLIERS.get(size_str[-1:].upper())
+    if multiplier is None:
+        return 0
+
+    return int(size_str[:-1]) * multiplier
+
+
+# VF self_config parameters: resource name and value converter
+_SELFCONFIG_PARAMS: typing.Dict[str, typing.Tuple[str, typing.Callable[[str], int]]] = {
+    'GGTT size': ('ggtt_size', _convert_units_to_bytes),
+    'LMEM size': ('lmem_size', _convert_units_to_bytes),
+    'contexts': ('contexts', int),
+    'doorbells': ('doorbells', int),
+    'tile mask': ('tile_mask', lambda value: int(value, base=16)),
+}
+
+
+def _parse_selfconfig(out: str) -> typing.Dict[str, int]:
+    """Parse VF self_config content into resource values (name: value)."""
+    resources: typing.Dict[str, int] = {}
+    for line in out.splitlines():
+        param, _, value = line.partition(':')
+        # Unknown parameters are skipped
+        if entry := _SELFCONFIG_PARAMS.get(param):
+            name, convert = entry
+            resources[name] = convert(value)
+
+    return resources
+
+
+class _QemuOutputReader():
+    """Single thread logging QEMU output (stdout/stderr pipes) of all VMs.
+    Pipes are multiplexed by one selector instead of a blocking reader thread per pipe.
+    Reader owns the registered pipes - they are closed on EOF (QEMU terminated).
+    """
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.selector: typing.Optional[selectors.BaseSelector] = None
+
+    def register(self, pipe: typing.BinaryIO, log: logging.Logger) -> None:
+        with self.lock:
+            if self.selector is None:
+                self.selector = selectors.DefaultSelector()
+                threading.Thread(target=self.__run, args=(self.selector,), name='QemuOutputReader',
+                                 daemon=True).start()
+            self.selector.register(pipe, selectors.EVENT_READ, (bytearray(), log))
+
+    @staticmethod
+    def __log_lines(log: logging.Logger, data: typing.Union[bytes, bytearray]) -> None:
+        for line in data.splitlines():
+            log.debug(line.decode(errors='replace').strip())
+
+    @staticmethod
+    def __run(selector: selectors.BaseSelector) -> None:
+        while True:
+            for key, _ in selector.select():
+                pipe: typing.BinaryIO = key.fileobj # type: ignore[assignment]
+                buf, log = key.data
+                try:
+                    data = os.read(key.fd, _QEMU_OUTPUT_READ_SIZE)
+                except OSError:
+                    data = b''
+                if not data:
+                    selector.unregister(pipe)
+                    pipe.close()
+                    # Flush the last (unterminated) line
+                    if buf:
+                        _QemuOutputReader.__log_lines(log, buf)
+                    continue
+
+                # Lines are split on raw bytes - decoded only if they are actually logged
+                if not log.isEnabledFor(logging.DEBUG):
+                    continue
+                buf += data
+                end = buf.rfind(b'\n')
+                if end >= 0:
+                    _QemuOutputReader.__log_lines(log, buf[:end])
+                    del buf[:end + 1]
+
+
+_qemu_output_reader = _QemuOutputReader()
+
 
 class VirtualMachine(MachineInterface):
     class Decorators():
-        @staticmethod
-        def alarm_handler(sig: signal.Signals, tb: FrameType) -> typing.Any:
-            raise exceptions.AlarmTimeoutError(f'Alarm timeout occured')
-
         @classmethod
-        def timeout_signal(cls, func: typing.Callable) -> typing.Callable:
+        def timeout_deadline(cls, func: typing.Callable) -> typing.Callable:
+            """Bound guest/monitor operations done by the decorated call with a deadline.
+            Deadline is per thread (enforced by the backends) - VMs may be driven from parallel threads.
+            """
             def timeout_wrapper(*args: typing.Any, **kwargs: typing.Optional[typing.Any]) -> typing.Any:
                 timeout: int = DEFAULT_TIMEOUT
                 if len(args) > 2:
@@ -41,20 +146,12 @@ class VirtualMachine(MachineInterface):
                     if isinstance(kwargs['timeout'], int):
                         timeout = kwargs['timeout']
 
-                # mypy: silence the following problem in signal.signal() call:
-                # error: Argument 2 to "signal" has incompatible type "Callable[[Signals, FrameType], Any]";
-                # expected "Union[Callable[[int, Optional[FrameType]], Any], int, Handlers, None]"  [arg-type]
-                signal.signal(signal.SIGALRM, cls.alarm_handler) # type: ignore[arg-type]
-                signal.alarm(timeout)
                 try:
-                    proc_ret = func(*args, **kwargs)
+                    with deadline.deadline(timeout):
+                        return func(*args, **kwargs)
                 except exceptions.AlarmTimeoutError:
                     logger.warning('Timeout (%ss) on %s', timeout, func.__name__)
                     raise
-                finally:
-                    signal.alarm(0)  # Cancel alarm
-
-                return proc_ret
 
             return timeout_wrapper
 
@@ -68,6 +165,17 @@ class VirtualMachine(MachineInterface):
         self.qmp_sockpath = posixpath.join('/tmp', f'mon{self.vmnum}.sock')
         self.drm_driver_name: str = driver
         self.igt_config: VmtbIgtConfig = igt_config
+        # QEMU arguments not depending on the VF/migration setup - built once for all power cycles
+        self.__qemu_base_command = [
+            'qemu-system-x86_64',
+            '-vnc', f':{self.vmnum}',
+            '-serial', 'stdio',
+            '-m', '4096',
+            '-chardev', f'socket,path={self.questagent_sockpath},server=on,wait=off,id=qga{self.vmnum}',
+            '-device', 'virtio-serial',
+            '-device', f'virtserialport,chardev=qga{self.vmnum},name=org.qemu.guest_agent.0',
+            '-chardev', f'socket,id=mon{self.vmnum},path={self.qmp_sockpath},server=on,wait=off',
+            '-mon', f'chardev=mon{self.vmnum},mode=control']
 
         if not posixpath.exists(backing_image):
             logger.error('No image for VM%s', self.vmnum)
@@ -105,13 +213,23 @@ class VirtualMachine(MachineInterface):
         self.process.terminate()
         # Lets wait and make sure that qemu shutdown
         try:
-            self.process.communicate(timeout=30)
+            self.process.wait(timeout=30)
         except subprocess.TimeoutExpired:
             print('QEMU did not terminate, killing it')
             self.process.kill()
 
     def __get_backing_file_format(self, backing_file: str) -> typing.Any:
-        """Get the format of the backing image file using qemu-img info."""
+        """Get the format of the backing image file.
+        Common image formats are detected by the header magic, qemu-img info is used for the rest (e.g. raw).
+        """
+        try:
+            with open(backing_file, 'rb') as image:
+                image_format = _IMAGE_FORMAT_MAGIC.get(image.read(4))
+            if image_format:
+                return image_format
+        except OSError as exc:
+            logger.debug('Backing file %s header not read: %s', backing_file, exc)
+
         command = ['qemu-img', 'info', '--output=json', backing_file]
         try:
             result = subprocess.run(command, capture_output=True, check=True)
@@ -140,25 +258,20 @@ class VirtualMachine(MachineInterface):
 
         return output_image
 
-    def __log_qemu_output(self, out: typing.TextIO) -> None:
-        stdoutlog = logging.getLogger(f'VM{self.vmnum}-kmsg')
-        for line in iter(out.readline, ''):
-            stdoutlog.debug(line.strip())
+    def __log_qemu_output(self, out: typing.BinaryIO) -> None:
+        # Larger pipe lets QEMU (guest serial console) write on while the output is being logged
+        try:
+            fcntl.fcntl(out.fileno(), fcntl.F_SETPIPE_SZ, _QEMU_OUTPUT_PIPE_SIZE)
+        except OSError as exc:
+            logger.debug('QEMU output pipe size not changed: %s', exc)
+        _qemu_output_reader.register(out, logging.getLogger(f'VM{self.vmnum}-kmsg'))
 
     def __sockets_exists(self) -> bool:
         return os.path.exists(self.questagent_sockpath) and os.path.exists(self.qmp_sockpath)
 
     def __get_popen_command(self) -> typing.List[str]:
-        command = ['qemu-system-x86_64',
-                   '-vnc', f':{self.vmnum}',
-                   '-serial', 'stdio',
-                   '-m', '4096',
-                   '-drive', f'file={self.image if not self.migrate_destination_vm else self.migrate_source_image}',
-                   '-chardev', f'socket,path={self.questagent_sockpath},server=on,wait=off,id=qga{self.vmnum}',
-                   '-device', 'virtio-serial',
-                   '-device', f'virtserialport,chardev=qga{self.vmnum},name=org.qemu.guest_agent.0',
-                   '-chardev', f'socket,id=mon{self.vmnum},path=/tmp/mon{self.vmnum}.sock,server=on,wait=off',
-                   '-mon', f'chardev=mon{self.vmnum},mode=control']
+        command = self.__qemu_base_command + [
+            '-drive', f'file={self.image if not self.migrate_destination_vm else self.migrate_source_image}']
 
         if self.vf_bdf:
             command.extend(['-enable-kvm', '-cpu', 'host'])
@@ -168,7 +281,8 @@ class VirtualMachine(MachineInterface):
             # If VM is migration destination - run in stopped/prelaunch state (explicit resume required)
             command.extend(['-S'])
 
-        logger.debug('QEMU command: %s', ' '.join(command))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('QEMU command: %s', ' '.join(command))
         return command
 
     def __get_key(self, base: typing.Dict, path: typing.List[str]) -> typing.Any:
@@ -227,22 +341,23 @@ class VirtualMachine(MachineInterface):
 
     @property
     def gt_nums(self) -> typing.List[int]:
-        self._gt_nums = self.get_gt_num_from_sysfs()
+        # GTs of the VF do not change while assigned to the VM - sysfs is probed until found
         if not self._gt_nums:
-            logger.warning("VM sysfs: missing GT index")
-            self._gt_nums = [0]
+            self._gt_nums = self.get_gt_num_from_sysfs()
+            if not self._gt_nums:
+                logger.warning("VM sysfs: missing GT index")
+                return [0]
 
         return self._gt_nums
 
     def get_gt_num_from_sysfs(self) -> typing.List[int]:
         # Get GT number of VF passed to a VM, based on an exisitng a sysfs path
-        vm_gt_num = []
-        if self.dir_exists(posixpath.join(self.sysfs_prefix_path, 'gt/gt0')):
-            vm_gt_num.append(0)
-        if self.dir_exists(posixpath.join(self.sysfs_prefix_path, 'gt/gt1')):
-            vm_gt_num.append(1)
+        # Both GT paths are checked by a single guest process
+        gt_path = posixpath.join(self.sysfs_prefix_path, 'gt/gt')
+        pid = self.execute(['/bin/sh', '-c', f'for gt in 0 1; do [ -d {gt_path}$gt ] && echo $gt; done; true'])
+        status = self.execute_wait(pid)
 
-        return vm_gt_num
+        return [int(gt_num) for gt_num in status.stdout.split()]
 
     def get_drm_driver_name(self) -> str:
         return self.drm_driver_name
@@ -250,7 +365,7 @@ class VirtualMachine(MachineInterface):
     def get_igt_config(self) -> VmtbIgtConfig:
         return self.igt_config
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def poweron(self) -> None:
         logger.debug('Powering on VM%s', self.vmnum)
         if self.is_running():
@@ -264,27 +379,23 @@ class VirtualMachine(MachineInterface):
         self.process = subprocess.Popen(
             args=command,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True)
+            stderr=subprocess.PIPE)
 
-        qemu_stdout_log_thread = threading.Thread(
-            target=self.__log_qemu_output, args=(
-                self.process.stdout,), daemon=True)
-        qemu_stdout_log_thread.start()
-
-        qemu_stderr_log_thread = threading.Thread(
-            target=self.__log_qemu_output, args=(
-                self.process.stderr,), daemon=True)
-        qemu_stderr_log_thread.start()
+        assert self.process.stdout and self.process.stderr
+        self.__log_qemu_output(self.process.stdout)
+        self.__log_qemu_output(self.process.stderr)
 
         if not self.is_running():
             logger.error('VM%s did not boot', self.vmnum)
             raise exceptions.GuestError(f'VM{self.vmnum} did not start')
 
         try:
+            # QEMU creates the sockets shortly after start - poll briefly first, then back off
+            delay = _SOCKET_POLL_MIN
             while not self.__sockets_exists():
                 logger.info('waiting for socket')
-                time.sleep(1)
+                time.sleep(deadline.remaining(delay))
+                delay = min(delay * 2, _SOCKET_POLL_MAX)
             # Passing five minutes timeout for every command
             self.ga = GuestAgentBackend(self.questagent_sockpath, 300)
             self.qm = QmpMonitor(self.qmp_sockpath, 300)
@@ -309,7 +420,7 @@ class VirtualMachine(MachineInterface):
 
         return False
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def poweroff(self) -> None:
         logger.debug('Powering off VM%s', self.vmnum)
         assert self.process
@@ -320,15 +431,13 @@ class VirtualMachine(MachineInterface):
         try:
             self.ga.poweroff()
             # Wait for shutdown event
-            event: str = self.qm.get_qmp_event()
-            while event != 'SHUTDOWN':
-                event = self.qm.get_qmp_event()
+            self.qm.wait_for_event('SHUTDOWN')
         except exceptions.AlarmTimeoutError:
             logger.warning('VM%s hanged on poweroff. Initiating forced termination', self.vmnum)
             self.process.terminate()
         finally:
-            # Wait and make sure that qemu shutdown
-            self.process.communicate()
+            # Wait and make sure that qemu shutdown (output pipes are drained by the reader)
+            self.process.wait()
 
             if self.__sockets_exists():
                 # Remove leftovers and notify about unclear qemu shutdown
@@ -342,10 +451,7 @@ class VirtualMachine(MachineInterface):
         self.ga.reboot()
 
         # Wait for 2x RESET event (guest-reset)
-        reset_event_count = 2
-        while reset_event_count > 0:
-            if self.qm.get_qmp_event() == 'RESET':
-                reset_event_count -= 1
+        self.qm.wait_for_event('RESET', count=2)
 
     def reset(self) -> None:
         """Reset VM via the QMP system_reset command."""
@@ -353,15 +459,11 @@ class VirtualMachine(MachineInterface):
         self.qm.system_reset()
 
         # Wait for 2x RESET event (host-qmp-system-reset, guest-reset)
-        reset_event_count = 2
-        while reset_event_count > 0:
-            if self.qm.get_qmp_event() == 'RESET':
-                reset_event_count -= 1
+        self.qm.wait_for_event('RESET', count=2)
 
     def pause(self) -> None:
         logger.debug('Pausing VM%s', self.vmnum)
-        self.qm.stop()
-        vm_status = self.qm.query_status()
+        vm_status = self.qm.query_status('stop')
         if vm_status != 'paused':
             if self.process:
                 self.process.terminate()
@@ -370,8 +472,7 @@ class VirtualMachine(MachineInterface):
 
     def resume(self) -> None:
         logger.debug('Resuming VM%s', self.vmnum)
-        self.qm.cont()
-        vm_status = self.qm.query_status()
+        vm_status = self.qm.query_status('cont')
         if vm_status != 'running':
             if self.process:
                 self.process.terminate()
@@ -381,14 +482,12 @@ class VirtualMachine(MachineInterface):
     def quit(self) -> None:
         logger.debug('Quitting VM%s', self.vmnum)
         self.qm.quit()
-        event: str = self.qm.get_qmp_event()
-        while event != 'SHUTDOWN':
-            event = self.qm.get_qmp_event()
+        self.qm.wait_for_event('SHUTDOWN')
 
     def _enable_suspend(self) -> None:
         if self.link_exists('/etc/systemd/system/suspend.target'):
             logger.debug('Enable (unmask) systemd suspend/sleep')
-            self.execute('systemctl unmask suspend.target sleep.target')
+            self.execute(['systemctl', 'unmask', 'suspend.target', 'sleep.target'])
 
     def suspend(self, mode: SuspendMode = SuspendMode.ACPI_S3) -> None:
         logger.debug('Suspending VM%s (mode: %s)', self.vmnum, mode)
@@ -401,9 +500,7 @@ class VirtualMachine(MachineInterface):
         else:
             raise exceptions.GuestError('Unknown suspend mode')
 
-        event: str = self.qm.get_qmp_event()
-        while event != 'SUSPEND':
-            event = self.qm.get_qmp_event()
+        self.qm.wait_for_event('SUSPEND')
 
         vm_status = self.qm.query_status()
         if vm_status != 'suspended':
@@ -416,9 +513,7 @@ class VirtualMachine(MachineInterface):
         logger.debug('Waking up VM%s', self.vmnum)
         self.qm.system_wakeup()
 
-        event: str = self.qm.get_qmp_event()
-        while event != 'WAKEUP':
-            event = self.qm.get_qmp_event()
+        self.qm.wait_for_event('WAKEUP')
 
         vm_status = self.qm.query_status()
         if vm_status != 'running':
@@ -429,8 +524,8 @@ class VirtualMachine(MachineInterface):
 
     # {"execute": "guest-exec", "arguments":{"path": "/some/path", "arg": [], "capture-output": true}}
     # {"error": {"class": "GenericError", "desc": "Guest... "}}
-    def execute(self, command: str) -> int:
-        arr_cmd = shlex.split(command)
+    def execute(self, command: typing.Union[str, typing.Sequence[str]]) -> int:
+        arr_cmd = split_command(command)
         execout: typing.Dict = self.ga.execute(arr_cmd[0], arr_cmd[1:])
         ret = execout.get('return')
         if ret:
@@ -443,31 +538,30 @@ class VirtualMachine(MachineInterface):
 
     # {'error': {'class': 'GenericError', 'desc': "Invalid parameter 'pid'"}}
     def execute_status(self, pid: int) -> ProcessResult:
-        out = self.ga.execute_status(pid)
+        return self.__to_process_result(self.ga.execute_status(pid))
+
+    @staticmethod
+    def __to_process_result(out: typing.Dict) -> ProcessResult:
         status = out.get('return')
         if not status:
             raise exceptions.GuestError(f'Not output from guest agent: {out}')
 
-        b64stdout = status.get('out-data', '')
-        stdout = base64.b64decode(b64stdout).decode('utf-8')
+        # Output is reported only once the process exited - skip decoding of absent/empty data
+        b64stdout = status.get('out-data')
+        stdout = base64.b64decode(b64stdout).decode('utf-8') if b64stdout else ''
 
-        b64stderr = status.get('err-data', '')
-        stderr = base64.b64decode(b64stderr).decode('utf-8')
+        b64stderr = status.get('err-data')
+        stderr = base64.b64decode(b64stderr).decode('utf-8') if b64stderr else ''
 
         return ProcessResult(status.get('exited'), status.get('exitcode', None), stdout, stderr)
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def execute_wait(self, pid: int, timeout: int = DEFAULT_TIMEOUT) -> ProcessResult:
-        exec_status = ProcessResult(False, -1, '', '')
-        while not exec_status.exited:
-            exec_status = self.execute_status(pid)
-            time.sleep(1)
-
-        return exec_status
+        return self.__to_process_result(self.ga.execute_wait(pid))
 
     def execute_signal(self, pid: int, sig: signal.Signals) -> None:
         signum = int(sig)
-        killpid = self.execute(f'kill -{signum} {pid}')
+        killpid = self.execute(['kill', f'-{signum}', str(pid)])
         self.execute_wait(killpid)
 
     def read_file_content(self, path: str) -> str:
@@ -478,16 +572,21 @@ class VirtualMachine(MachineInterface):
 
         try:
             eof: bool = False
-            file_content: typing.List[str] = []
+            file_content: typing.List[bytes] = []
             while not eof:
-                ret = self.ga.guest_file_read(handle)
-                eof = self.__get_key(ret, ['return', 'eof'])
-                b64buf: str = self.__get_key(ret, ['return', 'buf-b64'])
-                file_content.append(base64.b64decode(b64buf).decode('utf-8'))
+                # Chunk reads pipelined - a batch of requests per agent round trip
+                for ret in self.ga.guest_file_read_batch(handle, _FILE_READ_BATCH, _FILE_READ_CHUNK):
+                    b64buf: str = self.__get_key(ret, ['return', 'buf-b64'])
+                    if b64buf:
+                        file_content.append(base64.b64decode(b64buf))
+                    eof = self.__get_key(ret, ['return', 'eof'])
+                    if eof:
+                        break
         finally:
             self.ga.guest_file_close(handle)
 
-        return ''.join(file_content)
+        # Decoded once - multibyte characters may be split across chunks
+        return b''.join(file_content).decode('utf-8')
 
     def write_file_content(self, path: str, content: str) -> int:
         out: typing.Dict = self.ga.guest_file_open(path, 'w')
@@ -495,31 +594,35 @@ class VirtualMachine(MachineInterface):
         if not handle:
             raise exceptions.GuestError('Could not open file on guest')
 
-        b64buf: bytes = base64.b64encode(content.encode())
+        # Large content is split into separate (pipelined) writes - each request message is size limited
+        data = memoryview(content.encode())
+        chunks: typing.List[bytes] = [base64.b64encode(data[offset:offset + _FILE_WRITE_CHUNK])
+                                      for offset in range(0, len(data), _FILE_WRITE_CHUNK)] or [b'']
 
         try:
-            ret = self.ga.guest_file_write(handle, b64buf.decode('utf-8'))
-            count: int = self.__get_key(ret, ['return', 'count'])
+            count: int = 0
+            for ret in self.ga.guest_file_write_chunks(handle, chunks):
+                count += self.__get_key(ret, ['return', 'count'])
         finally:
             self.ga.guest_file_close(handle)
 
         return count
 
     def dir_exists(self, path: str) -> bool:
-        pid = self.execute(f'/bin/sh -c "[ -d {path} ]"')
+        pid = self.execute(['/bin/sh', '-c', f'[ -d {path} ]'])
         status = self.execute_wait(pid)
         if status.exit_code:
             return False
         return True
 
     def link_exists(self, path: str) -> bool:
-        pid = self.execute(f'/bin/sh -c "[ -h {path} ]"')
+        pid = self.execute(['/bin/sh', '-c', f'[ -h {path} ]'])
         status = self.execute_wait(pid)
         if status.exit_code:
             return False
         return True
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def ping(self, timeout: int = DEFAULT_TIMEOUT) -> bool:
         """Ping guest and return true if responding, false otherwise."""
         logger.debug('Ping VM%s', self.vmnum)
@@ -531,14 +634,12 @@ class VirtualMachine(MachineInterface):
 
         return True
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def save_state(self) -> None:
         logger.debug('Saving VM%s state (snapshot)', self.vmnum)
         self.qm.save_snapshot()
 
-        job_status: str = self.qm.get_qmp_event_job()
-        while job_status != 'concluded':
-            job_status = self.qm.get_qmp_event_job()
+        self.qm.wait_for_job_status('concluded')
 
         job_status, job_error = self.qm.query_jobs('snapshot-save')
         if job_status == 'concluded' and job_error is not None:
@@ -546,14 +647,12 @@ class VirtualMachine(MachineInterface):
 
         logger.debug('VM%s state save finished successfully', self.vmnum)
 
-    @Decorators.timeout_signal
+    @Decorators.timeout_deadline
     def load_state(self) -> None:
         logger.debug('Loading VM state (snapshot)')
         self.qm.load_snapshot()
 
-        job_status: str = self.qm.get_qmp_event_job()
-        while job_status != 'concluded':
-            job_status = self.qm.get_qmp_event_job()
+        self.qm.wait_for_job_status('concluded')
 
         job_status, job_error = self.qm.query_jobs('snapshot-load')
         if job_status == 'concluded' and job_error is not None:
@@ -567,19 +666,7 @@ class VirtualMachine(MachineInterface):
     # TODO: function perhaps could be moved to some new utils module
     # improve - consider regex to handle various formats eg. both M and MB
     def helper_convert_units_to_bytes(self, size_str: str) -> int:
-        size_str = size_str.upper()
-        size_int = 0
-
-        if size_str.endswith('B'):
-            size_int = int(size_str[0:-1])
-        elif size_str.endswith('K'):
-            size_int = int(size_str[0:-1]) * 1024
-        elif size_str.endswith('M'):
-            size_int = int(size_str[0:-1]) * 1024**2
-        elif size_str.endswith('G'):
-            size_int = int(size_str[0:-1]) * 1024**3
-
-        return size_int
+        return _convert_units_to_bytes(size_str)
 
     # helper_get_debugfs_selfconfig - read resources allocated to VF from debugfs:
     # /sys/kernel/debug/dri/@card/gt@gt_num/iov/self_config
@@ -589,16 +676,5 @@ class VirtualMachine(MachineInterface):
         path = posixpath.join(f'/sys/kernel/debug/dri/{card}/gt{gt_num}/iov/self_config')
         out = self.read_file_content(path)
 
-        for line in out.splitlines():
-            param, value = line.split(':')
-
-            if param == 'GGTT size':
-                self._ggtt_size = self.helper_convert_units_to_bytes(value)
-            elif param == 'LMEM size':
-                self._lmem_size = self.helper_convert_units_to_bytes(value)
-            elif param == 'contexts':
-                self._contexts = int(value)
-            elif param == 'doorbells':
-                self._doorbells = int(value)
-            elif param == 'tile mask':
-                self._tile_mask = int(value, base=16)
+        for name, value in _parse_selfconfig(out).items():
+            setattr(self, f'_{name}', value)
@@ -1,28 +1,55 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import collections.abc
+import concurrent.futures
+import functools
 import json
 import logging
+import os
 import re
 import typing
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 
 import pytest
 
-from bench import exceptions
+from bench import configure_file_logging, exceptions, print_banner
 from bench.helpers.helpers import (modprobe_driver, modprobe_driver_check)
 from bench.helpers.log import HOST_DMESG_FILE
+from bench.configurators.pci import GpuModel
 from bench.configurators.vgpu_profile_config import VgpuProfileConfigurator, VfSchedulingMode
 from bench.configurators.vgpu_profile import VgpuProfile
 from bench.configurators.vmtb_config import VmtbConfigurator
 from bench.machines.host import Host, Device
 from bench.machines.virtual.vm import VirtualMachine
 
+try:
+    import orjson
+
+    def _dump_json(obj: typing.Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+
+    _load_json = orjson.loads
+except ImportError: # orjson is optional - fall back to the stdlib serializer
+    def _dump_json(obj: typing.Any, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode()
+
+    _load_json = json.loads
 
 logger = logging.getLogger('Conftest')
 
+# Max LMEM assigned to a VF with the reduce VF LMEM workaround (512 MB)
+WA_VF_LMEM_MAX = 536870912
+
+
+def pytest_configure(config):
+    configure_file_logging()
+    print_banner()
+    # Drop test results left by an interrupted session
+    RESULTS_TESTS_FILE.unlink(missing_ok=True)
+
 
 def pytest_addoption(parser):
     parser.addoption('--vm-image',
@@ -33,7 +60,7 @@ def pytest_addoption(parser):
                      help='Device card index for test execution')
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VmmTestingConfig:
     """Structure represents test configuration used by a setup fixture.
 
@@ -45,6 +72,8 @@ class VmmTestingConfig:
     - auto_probe_vm_driver: probe guest DRM driver in setup fixture (VM must be powered on)
     - unload_host_drivers_on_teardown: unload host DRM drivers in teardown fixture
     - wa_reduce_vf_lmem: workaround to reduce VF LMEM (for save-restore/migration tests speed-up)
+
+    Config is immutable - the same instance is shared by all tests of a parametrized class.
     """
     num_vfs: int = 1
     max_num_vms: int = 2
@@ -70,6 +99,37 @@ class VmmTestingConfig:
                 f'\n\tW/A - reduce VF LMEM (improves migration time) = {self.wa_reduce_vf_lmem}')
 
 
+@functools.lru_cache(maxsize=None)
+def _get_vgpu_profile_configurator(vgpu_profiles_dir: Path, gpu_model: GpuModel) -> VgpuProfileConfigurator:
+    # Configurator (with supported profiles) is shared by all test classes of the session.
+    # Profiles are still selected per setup - VgpuProfile returned is modified by the tests (e.g. VF LMEM W/A).
+    return VgpuProfileConfigurator(vgpu_profiles_dir, gpu_model)
+
+
+class LazyVmList(collections.abc.Sequence):
+    """List of test VMs - VirtualMachine (with its QEMU image overlay) is created on the first access."""
+    def __init__(self, num_vms: int, create_vm: typing.Callable[[int], VirtualMachine]) -> None:
+        self.__create_vm = create_vm
+        self.__vms: typing.List[typing.Optional[VirtualMachine]] = [None] * num_vms
+
+    def __len__(self) -> int:
+        return len(self.__vms)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[vm_idx] for vm_idx in range(*index.indices(len(self)))]
+
+        vm_idx = range(len(self))[index] # Negative index resolved (and checked)
+        vm = self.__vms[vm_idx]
+        if vm is None:
+            vm = self.__vms[vm_idx] = self.__create_vm(vm_idx)
+        return vm
+
+    def created(self) -> typing.List[VirtualMachine]:
+        """Return VMs created so far."""
+        return [vm for vm in self.__vms if vm is not None]
+
+
 class VmmTestingSetup:
     def __init__(self, vmtb_config: VmtbConfigurator, cmdline_config, host, testing_config):
         self.testing_config: VmmTestingConfig = testing_config
@@ -83,11 +143,15 @@ class VmmTestingSetup:
         self.vgpu_profiles_dir = vmtb_config.vmtb_config_file.parent / vmtb_config.config.vgpu_profiles_path
 
         self.host.dut_index = self.dut_index
-        self.host.drm_driver_name = vmtb_config.get_host_config().driver
-        self.host.igt_config = vmtb_config.get_host_config().igt_config
 
-        self.host.load_drivers()
-        self.host.discover_devices()
+        # Host is prepared once per session - drivers are reloaded only if unloaded on a previous teardown
+        if not self.host.drivers_loaded:
+            self.host.load_drivers()
+            self.host.discover_devices()
+
+        # Device under test is resolved once - host devices are not rediscovered during the setup lifetime
+        self.__dut: Device = self.__find_dut()
+        dut = self.__dut
 
         logger.info("\nDUT info:"
                     "\n\tCard index: %s"
@@ -95,21 +159,20 @@ class VmmTestingSetup:
                     "\n\tDevice ID: %s (%s)"
                     "\n\tHost DRM driver: %s",
                     self.host.dut_index,
-                    self.get_dut().pci_info.bdf,
-                    self.get_dut().pci_info.devid, self.get_dut().gpu_model,
-                    self.get_dut().driver.get_name())
+                    dut.pci_info.bdf,
+                    dut.pci_info.devid, dut.gpu_model,
+                    dut.driver.get_name())
 
         self.vgpu_profile: VgpuProfile = self.get_vgpu_profile()
 
         # Start maximum requested number of VMs, but not more than VFs supported by the given vGPU profile
-        self.vms: typing.List[VirtualMachine] = [
-            VirtualMachine(vm_idx, self.guest_os_image,
-                           vmtb_config.get_guest_config().driver,
-                           vmtb_config.get_guest_config().igt_config)
-            for vm_idx in range(min(self.vgpu_profile.num_vfs, self.testing_config.max_num_vms))]
+        guest_config = vmtb_config.get_guest_config()
+        self.vms: LazyVmList = LazyVmList(
+            min(self.vgpu_profile.num_vfs, self.testing_config.max_num_vms),
+            lambda vm_idx: VirtualMachine(vm_idx, self.guest_os_image, guest_config.driver, guest_config.igt_config))
 
     def get_vgpu_profile(self) -> VgpuProfile:
-        configurator = VgpuProfileConfigurator(self.vgpu_profiles_dir, self.get_dut().gpu_model)
+        configurator = _get_vgpu_profile_configurator(self.vgpu_profiles_dir, self.__dut.gpu_model)
         try:
             vgpu_profile = configurator.get_vgpu_profile(self.testing_config.num_vfs,
                                                          self.testing_config.scheduling_mode)
@@ -121,13 +184,16 @@ class VmmTestingSetup:
 
         return vgpu_profile
 
-    def get_dut(self) -> Device:
+    def __find_dut(self) -> Device:
         try:
             return self.host.gpu_devices[self.dut_index]
         except IndexError as exc:
             logger.error("Invalid VMTB config - device card index = %s not available", self.dut_index)
             raise exceptions.VmtbConfigError(f'Device card index = {self.dut_index} not available') from exc
 
+    def get_dut(self) -> Device:
+        return self.__dut
+
     @property
     def get_vm(self):
         return self.vms
@@ -136,17 +202,29 @@ class VmmTestingSetup:
         return len(self.vms)
 
     def poweron_vms(self):
-        for vm in self.vms:
-            vm.poweron()
+        # VMs are independent - boot them concurrently (the first boot error is raised)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(self.vms))) as executor:
+            list(executor.map(lambda vm: vm.poweron(), self.vms))
+
+    @staticmethod
+    def __poweroff_vm(vm: VirtualMachine) -> bool:
+        """Power off the VM (if running) and return false on error."""
+        if vm.is_running():
+            try:
+                vm.poweroff()
+            except Exception as exc:
+                logger.warning("Error on VM%s poweroff (%s)", vm.vmnum, exc)
+                return False
+
+        return True
 
     def poweroff_vms(self):
-        for vm in self.vms:
-            if vm.is_running():
-                try:
-                    vm.poweroff()
-                except Exception as exc:
-                    self.testing_config.unload_host_drivers_on_teardown = True
-                    logger.warning("Error on VM%s poweroff (%s)", vm.vmnum, exc)
+        # VMs never accessed by the test were not even created
+        vms = self.vms.created()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(vms))) as executor:
+            if not all(list(executor.map(self.__poweroff_vm, vms))):
+                # Only this setup is affected - the config shared with the other tests is not modified
+                self.testing_config = replace(self.testing_config, unload_host_drivers_on_teardown=True)
 
         if self.testing_config.unload_host_drivers_on_teardown:
             raise exceptions.GuestError('VM poweroff issue - cleanup on test teardown')
@@ -157,10 +235,13 @@ class VmmTestingSetup:
         except Exception as exc:
             logger.error("Error on test teardown (%s)", exc)
         finally:
-            num_vfs = self.get_dut().get_current_vfs()
-            self.get_dut().remove_vfs()
-            self.get_dut().reset_provisioning(num_vfs)
-            self.get_dut().cancel_work()
+            dut = self.__dut
+            # Kept sequential: VF provisioning is reset only once VFs are disabled,
+            # VMs are already powered off (concurrently) and cancel_work is a no-op for Xe
+            num_vfs = dut.get_current_vfs()
+            dut.remove_vfs()
+            dut.reset_provisioning(num_vfs)
+            dut.cancel_work()
 
             if self.testing_config.unload_host_drivers_on_teardown:
                 self.host.unload_drivers()
@@ -174,11 +255,32 @@ def fixture_get_vmtb_config(create_host_log, pytestconfig):
     return VmtbConfigurator(vmtb_config_file_path)
 
 
+# Host dmesg log descriptor used to collect (and clear) the log per test result, kept open for the session
+_host_dmesg_fd: typing.Optional[int] = None
+
+
 @pytest.fixture(scope='session', name='create_host_log')
 def fixture_create_host_log():
-    if HOST_DMESG_FILE.exists():
-        HOST_DMESG_FILE.unlink()
-    HOST_DMESG_FILE.touch()
+    global _host_dmesg_fd # pylint: disable=W0603
+    # Truncate rather than recreate - kernel log decorators keep the file open
+    _host_dmesg_fd = os.open(HOST_DMESG_FILE, os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644)
+    yield
+    os.close(_host_dmesg_fd)
+    _host_dmesg_fd = None
+
+
+def _collect_host_dmesg(dmesg_fd: int) -> str:
+    """Read the whole host dmesg log and clear it."""
+    # Clean test run - nothing logged since the previous result, no read or truncate needed
+    if os.fstat(dmesg_fd).st_size == 0:
+        return ''
+
+    chunks: typing.List[bytes] = []
+    os.lseek(dmesg_fd, 0, os.SEEK_SET)
+    while chunk := os.read(dmesg_fd, 65536):
+        chunks.append(chunk)
+    os.ftruncate(dmesg_fd, 0)
+    return b''.join(chunks).decode('utf-8')
 
 
 @pytest.fixture(scope='session', name='get_cmdline_config')
@@ -194,8 +296,20 @@ def fixture_get_host():
     return Host()
 
 
+@pytest.fixture(scope='session', name='prepared_host')
+def fixture_prepared_host(get_vmtb_config, get_host):
+    """Load host drivers and discover devices once per test session."""
+    host: Host = get_host
+    host.drm_driver_name = get_vmtb_config.get_host_config().driver
+    host.igt_config = get_vmtb_config.get_host_config().igt_config
+
+    host.load_drivers()
+    host.discover_devices()
+    return host
+
+
 @pytest.fixture(scope='class', name='setup_vms')
-def fixture_setup_vms(get_vmtb_config, get_cmdline_config, get_host, request):
+def fixture_setup_vms(get_vmtb_config, get_cmdline_config, prepared_host, request):
     """Arrange VM environment for the VMM Flows test execution.
 
     VM setup steps follow the configuration provided as VmmTestingConfig parameter, including:
@@ -208,9 +322,9 @@ def fixture_setup_vms(get_vmtb_config, get_cmdline_config, get_host, request):
     where 'set_test_config' provides request parameter with a VmmTestingConfig (usually list of configs).
     """
     tc: VmmTestingConfig = request.param
-    logger.debug(repr(tc))
+    logger.debug('%r', tc)
 
-    host: Host = get_host
+    host: Host = prepared_host
     ts: VmmTestingSetup = VmmTestingSetup(get_vmtb_config, get_cmdline_config, host, tc)
 
     device: Device = ts.get_dut()
@@ -221,18 +335,19 @@ def fixture_setup_vms(get_vmtb_config, get_cmdline_config, get_host, request):
 
     # XXX: VF migration on discrete devices (with LMEM) is currently quite slow.
     # As a temporary workaround, reduce size of LMEM assigned to VFs to speed up a state save/load process.
+    # Original VF LMEM quota - set only if the workaround is applied (checked once, restored on teardown)
+    org_vgpu_profile_vfLmem: typing.Optional[int] = None
     if tc.wa_reduce_vf_lmem and device.has_lmem():
         logger.debug("W/A: reduce VFs LMEM quota to accelerate state save/restore")
         org_vgpu_profile_vfLmem = ts.vgpu_profile.resources.vfLmem
-        # Assign max 512 MB to VF
-        ts.vgpu_profile.resources.vfLmem = min(ts.vgpu_profile.resources.vfLmem // 2, 536870912)
+        ts.vgpu_profile.resources.vfLmem = min(org_vgpu_profile_vfLmem // 2, WA_VF_LMEM_MAX)
 
     device.provision(ts.vgpu_profile)
 
     assert device.create_vf(num_vfs) == num_vfs
 
     if tc.auto_poweron_vm:
-        bdf_list = [device.get_vf_bdf(vf) for vf in range(1, num_vms + 1)]
+        bdf_list = device.get_vfs_bdf(*range(1, num_vms + 1))
         for vm, bdf in zip(ts.get_vm, bdf_list):
             vm.assign_vf(bdf)
 
@@ -240,15 +355,18 @@ def fixture_setup_vms(get_vmtb_config, get_cmdline_config, get_host, request):
 
         if tc.auto_probe_vm_driver:
             modprobe_cmds = [modprobe_driver(vm) for vm in ts.get_vm]
-            for i, cmd in enumerate(modprobe_cmds):
-                assert modprobe_driver_check(ts.get_vm[i], cmd), f'modprobe failed on VM{i}'
+            # Results of the guest driver probes are awaited concurrently
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_vms)) as executor:
+                modprobe_results = list(executor.map(modprobe_driver_check, ts.get_vm, modprobe_cmds))
+            for i, modprobe_success in enumerate(modprobe_results):
+                assert modprobe_success, f'modprobe failed on VM{i}'
 
     logger.info('[Test execution: %sVF-%sVM]', num_vfs, num_vms)
     yield ts
 
     logger.info('[Test teardown: %sVF-%sVM]', num_vfs, num_vms)
     # XXX: cleanup counterpart for VFs LMEM quota workaround - restore original value
-    if tc.wa_reduce_vf_lmem and device.has_lmem():
+    if org_vgpu_profile_vfLmem is not None:
         ts.vgpu_profile.resources.vfLmem = org_vgpu_profile_vfLmem
 
     ts.teardown()
@@ -262,46 +380,77 @@ def idfn_test_config(test_config: VmmTestingConfig):
 
 
 RESULTS_FILE = Path() / "results.json"
+# Test results are appended (one JSON line per test) as tests finish and merged into the results file at the end
+RESULTS_TESTS_FILE = Path() / "results.tests.jsonl"
+# Offset of the latest record of each test in the test results file - a rerun test keeps its place, but the last result
+_results_index: typing.Dict[str, int] = {}
 results = {
     "results_version": 10,
     "name": "results",
-    "tests": {},
 }
 
 
-@pytest.hookimpl(hookwrapper=True)
-def pytest_report_teststatus(report):
-    yield
-    with open(HOST_DMESG_FILE, 'r+', encoding='utf-8') as dmesg_file:
-        dmesg = dmesg_file.read()
-        test_string = re.findall('[A-Za-z_.]*::.*', report.nodeid)[0]
-        results["name"] = f"vmtb_{test_string}"
-        test_name = f"vmtb@{test_string}"
-        if report.when == 'call':
+# Test part of the node ID reported in results (e.g. test_file.py::TestClass::test_name[param])
+_NODEID_RE = re.compile('[A-Za-z_.]*::.*')
+
+
+def pytest_runtest_logreport(report):
+    # Results are recorded once per report - pytest_report_teststatus may be called again
+    # (e.g. by the short test summary, after the session finish), so it is not used here.
+    # Teardown reports are not recorded in results
+    if report.when not in ('call', 'setup'):
+        return
+
+    nodeid_match = _NODEID_RE.search(report.nodeid)
+    test_string = nodeid_match.group(0) if nodeid_match else report.nodeid
+    results["name"] = f"vmtb_{test_string}"
+    test_name = f"vmtb@{test_string}"
+
+    if report.when == 'call':
+        # Captured output is only joined for tests that did not pass
+        if report.passed:
+            result = "pass"
+            out = f"{test_name} passed"
+        else:
+            result = "fail" if report.failed else "skip"
             out = report.capstdout
-            if report.passed:
-                result = "pass"
-                out = f"{test_name} passed"
-            elif report.failed:
-                result = "fail"
-            else:
-                result = "skip"
-            result = {"out": out, "result": result, "time": {"start": 0, "end": report.duration},
-                    "err": report.longreprtext, "dmesg": dmesg}
-            results["tests"][test_name] = result
-            dmesg_file.truncate(0)
-        elif report.when == 'setup' and report.failed:
-            result = {"out": report.capstdout, "result": "crash", "time": {"start": 0, "end": report.duration},
-                    "err": report.longreprtext, "dmesg": dmesg}
-            results["tests"][test_name] = result
-            dmesg_file.truncate(0)
+    elif report.failed:
+        out = report.capstdout
+        result = "crash"
+    else:
+        # Passed (or skipped) setup - host kernel log is collected further, with the test call result
+        return
+
+    # Host kernel log captured since the previous result is attached to this one and dropped from the file
+    dmesg = _collect_host_dmesg(_host_dmesg_fd) if _host_dmesg_fd is not None else ''
+
+    test_result = {"out": out, "result": result, "time": {"start": 0, "end": report.duration},
+                   "err": report.longreprtext, "dmesg": dmesg}
+    with open(RESULTS_TESTS_FILE, 'ab') as tests_file:
+        _results_index[test_name] = tests_file.tell()
+        tests_file.write(_dump_json([test_name, test_result]) + b'\n')
 
 
 @pytest.hookimpl()
 def pytest_sessionfinish():
-    if RESULTS_FILE.exists():
-        RESULTS_FILE.unlink()
-    RESULTS_FILE.touch()
-    jsonString = json.dumps(results, indent=2)
-    with open(str(RESULTS_FILE), 'w',  encoding='utf-8') as f:
-        f.write(jsonString)
+    # Written in the json.dumps(indent=2) layout, but test by test - results of all tests are never held in memory
+    with open(RESULTS_FILE, 'wb') as f:
+        f.write(b'{\n')
+        for key, value in results.items():
+            f.write(b'  %s: %s,\n' % (_dump_json(key), _dump_json(value)))
+        f.write(b'  "tests": {')
+
+        num_tests = 0
+        if _results_index:
+            with open(RESULTS_TESTS_FILE, 'rb') as tests_file:
+                for offset in _results_index.values():
+                    tests_file.seek(offset)
+                    test_name, test_result = _load_json(tests_file.readline())
+                    f.write(b'%s\n    %s: ' % (b',' if num_tests else b'', _dump_json(test_name)))
+                    # Nested at the third level - JSON strings contain no raw newlines, so lines are safe to indent
+                    f.write(_dump_json(test_result, indent=True).replace(b'\n', b'\n    '))
+                    num_tests += 1
+            RESULTS_TESTS_FILE.unlink(missing_ok=True)
+            _results_index.clear()
+
+        f.write(b'\n  }\n}' if num_tests else b'}\n}')
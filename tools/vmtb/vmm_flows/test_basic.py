@@ -1,8 +1,8 @@
 # SPDX-License-Identifier: MIT
 # Copyright © 2024 Intel Corporation
 
+import functools
 import logging
-import time
 from typing import List, Tuple
 
 import pytest
@@ -14,7 +14,7 @@ from bench.executors.gem_wsim import (ONE_CYCLE_DURATION_MS,
                                       gem_wsim_parallel_exec_and_check)
 from bench.executors.igt import IgtExecutor, IgtType
 from bench.helpers.helpers import (driver_check, igt_check, igt_run_check,
-                                   modprobe_driver_run_check)
+                                   modprobe_driver_run_check, wait_until)
 from vmm_flows.conftest import (VmmTestingConfig, VmmTestingSetup,
                                 idfn_test_config)
 
@@ -24,20 +24,31 @@ WL_ITERATIONS_10S = 1000
 WL_ITERATIONS_30S = 3000
 MS_IN_SEC = 1000
 DELAY_FOR_WORKLOAD_SEC = 2 # Waiting gem_wsim to be running [seconds]
-DELAY_FOR_RELOAD_SEC = 3 # Waiting before driver reloading [seconds]
+DELAY_FOR_RELOAD_SEC = 3 # Max wait for driver unload before reloading [seconds]
+
+# Single workload takes 10ms GPU time, multiplied by 1000 iterations
+# gives the expected 10s duration and 100 workloads/sec (shared by all VMs)
+WSIM_10S_ELAPSED_PER_VM_SEC = ONE_CYCLE_DURATION_MS * WL_ITERATIONS_10S / MS_IN_SEC
+WSIM_WORKLOADS_PER_SEC = MS_IN_SEC / ONE_CYCLE_DURATION_MS
+# Expected 30s workload duration with the accepted +/-20% tolerance [seconds]
+WSIM_30S_ELAPSED_SEC = ONE_CYCLE_DURATION_MS * WL_ITERATIONS_30S / MS_IN_SEC
+WSIM_30S_ELAPSED_MIN_SEC = WSIM_30S_ELAPSED_SEC * 0.8
+WSIM_30S_ELAPSED_MAX_SEC = WSIM_30S_ELAPSED_SEC * 1.2
+
+
+@functools.lru_cache(maxsize=None)
+def _get_test_config(num_vfs: int, scheduling_mode: VfSchedulingMode,
+                     max_vms: int, vf_driver_load: bool) -> VmmTestingConfig:
+    # Configs are immutable - variants repeated by several test classes share a single instance
+    return VmmTestingConfig(num_vfs, max_vms, scheduling_mode, auto_probe_vm_driver=vf_driver_load)
 
 
 def set_test_config(test_variants: List[Tuple[int, VfSchedulingMode]],
                     max_vms: int = 2, vf_driver_load: bool = True) -> List[VmmTestingConfig]:
     """Helper function to provide a parametrized test with a list of test configuration variants."""
     logger.debug("Init test variants: %s", test_variants)
-    test_configs: List[VmmTestingConfig] = []
-
-    for config in test_variants:
-        (num_vfs, scheduling_mode) = config
-        test_configs.append(VmmTestingConfig(num_vfs, max_vms, scheduling_mode, auto_probe_vm_driver=vf_driver_load))
-
-    return test_configs
+    return [_get_test_config(num_vfs, scheduling_mode, max_vms, vf_driver_load)
+            for num_vfs, scheduling_mode in test_variants]
 
 
 test_variants_1 = [(1, VfSchedulingMode.DEFAULT_PROFILE), (2, VfSchedulingMode.DEFAULT_PROFILE)]
@@ -92,10 +103,8 @@ class TestVmWorkload:
         if ts.get_num_vms() < 2:
             pytest.skip("Test scenario not supported for 1xVM setup ")
 
-        # Single workload takes 10ms GPU time, multiplied by 1000 iterations
-        # gives the expected 10s duration and 100 workloads/sec
-        expected = GemWsimResult(ONE_CYCLE_DURATION_MS * WL_ITERATIONS_10S * len(ts.vms) / MS_IN_SEC,
-                                 MS_IN_SEC/ONE_CYCLE_DURATION_MS / len(ts.vms))
+        num_vms = len(ts.vms)
+        expected = GemWsimResult(WSIM_10S_ELAPSED_PER_VM_SEC * num_vms, WSIM_WORKLOADS_PER_SEC / num_vms)
 
         # Check preemptible workload
         result = gem_wsim_parallel_exec_and_check(ts.vms, PREEMPT_10MS_WORKLOAD, WL_ITERATIONS_10S, expected)
@@ -122,16 +131,15 @@ class TestVfDriverLoadRemove:
         logger.info("[%s] Load VF driver and run basic WL - first VM", vm_first)
         assert modprobe_driver_run_check(vm_first)
 
-        expected_elapsed_sec = ONE_CYCLE_DURATION_MS * WL_ITERATIONS_30S / MS_IN_SEC
         gem_wsim = GemWsim(vm_first, 1, WL_ITERATIONS_30S, PREEMPT_10MS_WORKLOAD)
-        time.sleep(DELAY_FOR_WORKLOAD_SEC)
-        assert gem_wsim.is_running()
+        # Workload is given time to start submitting, but failure within that window is reported right away
+        assert not wait_until(lambda: not gem_wsim.is_running(), DELAY_FOR_WORKLOAD_SEC)
 
         logger.info("[%s] Load VF driver - last VM", vm_last)
         assert modprobe_driver_run_check(vm_last)
 
         result = gem_wsim.wait_results()
-        assert expected_elapsed_sec * 0.8 < result.elapsed_sec < expected_elapsed_sec * 1.2
+        assert WSIM_30S_ELAPSED_MIN_SEC < result.elapsed_sec < WSIM_30S_ELAPSED_MAX_SEC
 
     def test_reload(self, setup_vms):
         logger.info("Test VM driver reload: VF driver remove is followed by probe while other VM executes workload")
@@ -141,20 +149,20 @@ class TestVfDriverLoadRemove:
         vm_last = ts.vms[-1]
 
         logger.info("[%s] Run basic WL - last VM", vm_last)
-        expected_elapsed_sec = ONE_CYCLE_DURATION_MS * WL_ITERATIONS_30S / MS_IN_SEC
         gem_wsim = GemWsim(vm_last, 1, WL_ITERATIONS_30S, PREEMPT_10MS_WORKLOAD)
-        time.sleep(DELAY_FOR_WORKLOAD_SEC)
-        assert gem_wsim.is_running()
+        assert not wait_until(lambda: not gem_wsim.is_running(), DELAY_FOR_WORKLOAD_SEC)
 
         logger.info("[%s] Remove VF driver - first VM", vm_first)
-        rmmod_pid = vm_first.execute(f'modprobe -rf {vm_first.get_drm_driver_name()}')
+        drm_driver = vm_first.get_drm_driver_name()
+        rmmod_pid = vm_first.execute(f'modprobe -rf {drm_driver}')
         assert vm_first.execute_wait(rmmod_pid).exit_code == 0
 
-        time.sleep(DELAY_FOR_RELOAD_SEC)
+        # Reload as soon as the module is gone instead of after a fixed delay
+        assert wait_until(lambda: not vm_first.dir_exists(f'/sys/module/{drm_driver}'), DELAY_FOR_RELOAD_SEC)
 
         logger.info("[%s] Reload VF driver and run basic WL - first VM", vm_first)
         assert modprobe_driver_run_check(vm_first)
         assert igt_run_check(vm_first, IgtType.EXEC_STORE)
 
         result = gem_wsim.wait_results()
-        assert expected_elapsed_sec * 0.8 < result.elapsed_sec < expected_elapsed_sec * 1.2
+        assert WSIM_30S_ELAPSED_MIN_SEC < result.elapsed_sec < WSIM_30S_ELAPSED_MAX_SEC